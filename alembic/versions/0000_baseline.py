@@ -0,0 +1,132 @@
+"""baseline schema
+
+Revision ID: 0000_baseline
+Revises: 
+Create Date: 2026-10-17 12:00:00.000000
+
+Исходная схема приложения (таблицы, которые раньше создавались только через create_all).
+Уже существующие таблицы пропускаются, поэтому миграцию можно применить и к базе,
+созданной приложением до появления Alembic.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0000_baseline'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _table_exists(name: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _table_exists("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("first_name", sqlmodel.AutoString(length=50), nullable=False),
+            sa.Column("last_name", sqlmodel.AutoString(length=50), nullable=False),
+            sa.Column("middle_name", sqlmodel.AutoString(length=50), nullable=True),
+            sa.Column("email", sqlmodel.AutoString(length=100), nullable=False),
+            sa.Column("password_hash", sqlmodel.AutoString(), nullable=False),
+            sa.Column("status", sa.Enum("active", "deleted", name="userstatus"), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("email"),
+        )
+    if not _table_exists("roles"):
+        op.create_table(
+            "roles",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.AutoString(length=50), nullable=False),
+            sa.Column("description", sqlmodel.AutoString(length=200), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+    if not _table_exists("permissions"):
+        op.create_table(
+            "permissions",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.AutoString(length=100), nullable=False),
+            sa.Column("resource", sqlmodel.AutoString(length=50), nullable=False),
+            sa.Column("action", sqlmodel.AutoString(length=50), nullable=False),
+            sa.Column("description", sqlmodel.AutoString(length=200), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+    if not _table_exists("products"):
+        op.create_table(
+            "products",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.AutoString(length=100), nullable=False),
+            sa.Column("description", sqlmodel.AutoString(length=500), nullable=True),
+            sa.Column("price", sa.Float(), nullable=False),
+            sa.Column("category", sqlmodel.AutoString(length=50), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    if not _table_exists("revokedtokens"):
+        op.create_table(
+            "revokedtokens",
+            sa.Column("jti", sqlmodel.AutoString(length=64), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("jti"),
+        )
+        op.create_index("ix_revokedtokens_expires_at", "revokedtokens", ["expires_at"])
+    if not _table_exists("userroles"):
+        op.create_table(
+            "userroles",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("user_id", sa.Uuid(), nullable=False),
+            sa.Column("role_id", sa.Uuid(), nullable=False),
+            sa.ForeignKeyConstraint(["role_id"], ["roles.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("user_id", "role_id", name="uq_user_role"),
+        )
+    if not _table_exists("rolepermissions"):
+        op.create_table(
+            "rolepermissions",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("role_id", sa.Uuid(), nullable=False),
+            sa.Column("permission_id", sa.Uuid(), nullable=False),
+            sa.ForeignKeyConstraint(["permission_id"], ["permissions.id"]),
+            sa.ForeignKeyConstraint(["role_id"], ["roles.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("role_id", "permission_id", name="uq_role_permission"),
+        )
+    if not _table_exists("orders"):
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("user_id", sa.Uuid(), nullable=False),
+            sa.Column("product_id", sa.Uuid(), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("total_amount", sa.Float(), nullable=False),
+            sa.Column("status", sqlmodel.AutoString(length=20), nullable=False),
+            sa.ForeignKeyConstraint(["product_id"], ["products.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("orders")
+    op.drop_table("rolepermissions")
+    op.drop_table("userroles")
+    op.drop_index("ix_revokedtokens_expires_at", table_name="revokedtokens")
+    op.drop_table("revokedtokens")
+    op.drop_table("products")
+    op.drop_table("permissions")
+    op.drop_table("roles")
+    op.drop_table("users")
+    op.execute("DROP TYPE IF EXISTS userstatus")
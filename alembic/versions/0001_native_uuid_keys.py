@@ -0,0 +1,79 @@
+"""native uuid primary and foreign keys
+
+Revision ID: 0001_native_uuid_keys
+Revises: 0000_baseline
+Create Date: 2026-10-17 12:00:00.000000
+
+Переводит первичные и внешние ключи из VARCHAR (str(uuid4())) в нативный uuid.
+Существующие значения сохраняются (id::uuid), новые строки получают UUIDv7 из приложения.
+Если users.id уже имеет тип uuid (таблицы созданы базовой миграцией или create_all), миграция ничего не делает.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_native_uuid_keys'
+down_revision: Union[str, None] = '0000_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRIMARY_KEY_TABLES = ("users", "roles", "permissions", "products", "userroles", "rolepermissions", "orders")
+# (таблица, колонка, таблица, на которую ссылается внешний ключ)
+FOREIGN_KEYS = (
+    ("userroles", "user_id", "users"),
+    ("userroles", "role_id", "roles"),
+    ("rolepermissions", "role_id", "roles"),
+    ("rolepermissions", "permission_id", "permissions"),
+    ("orders", "user_id", "users"),
+    ("orders", "product_id", "products"),
+)
+
+
+def _column_type(table: str, column: str) -> str | None:
+    """Тип колонки в БД; в offline-режиме (--sql) каталог недоступен и возвращается None"""
+    if context.is_offline_mode():
+        return None
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column}
+    ).scalar()
+
+
+def _drop_foreign_keys() -> None:
+    """Внешние ключи мешают смене типа; имена — стандартные для PostgreSQL ({table}_{column}_fkey)"""
+    for table, column, _ in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{column}_fkey")
+
+
+def _create_foreign_keys() -> None:
+    for table, column, referred_table in FOREIGN_KEYS:
+        op.create_foreign_key(f"{table}_{column}_fkey", table, referred_table, [column], ["id"])
+
+
+def _convert(target_type: str, using: str) -> None:
+    _drop_foreign_keys()
+    for table in PRIMARY_KEY_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id TYPE {target_type} USING {using.format(column='id')}")
+    for table, column, _ in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {target_type} USING {using.format(column=column)}")
+    _create_foreign_keys()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _column_type("users", "id") == "uuid":
+        return
+    _convert("uuid", "{column}::uuid")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _column_type("users", "id") not in (None, "uuid"):
+        return
+    _convert("VARCHAR", "{column}::text")
@@ -0,0 +1,47 @@
+"""indexes for hot lookup paths
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_native_uuid_keys
+Create Date: 2026-10-17 12:30:00.000000
+
+Индексы строятся через CREATE INDEX CONCURRENTLY вне транзакции миграции,
+поэтому таблицы не блокируются на запись. Поиск ролей пользователя и разрешений
+роли уже покрывают уникальные индексы uq_user_role и uq_role_permission.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_hot_path_indexes'
+down_revision: Union[str, None] = '0001_native_uuid_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки, дополнительные параметры create_index)
+INDEXES = (
+    # «Мои заказы»: WHERE user_id = ... ORDER BY id
+    ("ix_orders_user_id_id", "orders", ["user_id", "id"], {}),
+    # Обратные связи RBAC: пользователи роли и роли разрешения без обращения к таблице
+    ("ix_userroles_role_id", "userroles", ["role_id"], {"postgresql_include": ["user_id"]}),
+    ("ix_rolepermissions_permission_id", "rolepermissions", ["permission_id"], {"postgresql_include": ["role_id"]}),
+    ("ix_permissions_resource_action", "permissions", ["resource", "action"], {"postgresql_include": ["id"]}),
+    # Список активных пользователей
+    ("ix_users_active_id", "users", ["id"], {"postgresql_where": sa.text("status = 'active'")}),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **options)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""product facet aggregate
+
+Revision ID: 0004_product_facets
+Revises: 0003_product_search
+Create Date: 2026-10-17 14:00:00.000000
+
+Таблица productfacets: число продуктов по (категория, ценовой интервал).
+Заполняется приложением при старте (rebuild_facets), далее обновляется дельтами.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_product_facets'
+down_revision: Union[str, None] = '0003_product_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "productfacets",
+        sa.Column("category", sqlmodel.AutoString(length=50), nullable=False),
+        sa.Column("price_bucket", sa.Integer(), nullable=False),
+        sa.Column("product_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("category", "price_bucket"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("productfacets")
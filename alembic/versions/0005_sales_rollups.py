@@ -0,0 +1,45 @@
+"""sales rollup table
+
+Revision ID: 0005_sales_rollups
+Revises: 0004_product_facets
+Create Date: 2026-10-17 15:00:00.000000
+
+Таблица salesrollups: число заказов, количество и выручка по измерениям
+(total, status, product, category, user). Приложение заполняет ее при первом
+запуске (ensure_sales_rollups), далее она обновляется дельтами.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_sales_rollups'
+down_revision: Union[str, None] = '0004_product_facets'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "salesrollups",
+        sa.Column("dimension", sqlmodel.AutoString(length=20), nullable=False),
+        sa.Column("key", sqlmodel.AutoString(length=50), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("dimension", "key"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_salesrollups_dimension_revenue", "salesrollups", ["dimension", "revenue"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_salesrollups_dimension_revenue", table_name="salesrollups")
+    op.drop_table("salesrollups")
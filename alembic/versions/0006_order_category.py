@@ -0,0 +1,35 @@
+"""order category
+
+Revision ID: 0006_order_category
+Revises: 0005_sales_rollups
+Create Date: 2026-10-17 18:00:00.000000
+
+Колонка orders.category: категория продукта на момент заказа. Итоги продаж по
+категориям считаются по ней, поэтому смена категории продукта не расходится с
+пересчетом. Существующие заказы получают текущую категорию продукта.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_order_category'
+down_revision: Union[str, None] = '0005_sales_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Колонку мог уже создать create_all при старте приложения
+    op.execute("ALTER TABLE orders ADD COLUMN IF NOT EXISTS category VARCHAR(50)")
+    op.execute(
+        "UPDATE orders SET category = products.category "
+        "FROM products WHERE products.id = orders.product_id AND orders.category IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("orders", "category")
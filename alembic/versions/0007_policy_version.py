@@ -0,0 +1,39 @@
+"""policy version
+
+Revision ID: 0007_policy_version
+Revises: 0006_order_category
+Create Date: 2026-10-17 19:00:00.000000
+
+Таблица policyversions: одна строка с версией политики доступа. Версия
+увеличивается в транзакции каждого изменения ролей, разрешений и назначений
+ролей пользователям; процессы сверяют с ней матрицу прав и claim access-токенов.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_policy_version'
+down_revision: Union[str, None] = '0006_order_category'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицу мог уже создать create_all при старте приложения
+    op.create_table(
+        "policyversions",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.execute("INSERT INTO policyversions (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("policyversions")
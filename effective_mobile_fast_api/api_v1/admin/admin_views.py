@@ -1,13 +1,24 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
-from effective_mobile_fast_api.api_v1.auth.dependencies import require_admin
-from effective_mobile_fast_api.core.db import get_db
+from effective_mobile_fast_api.api_v1.admin.exports import csv_export_response, orders_export_query, users_export_query
+from effective_mobile_fast_api.api_v1.auth.dependencies import principal_cache, require_admin
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
+from effective_mobile_fast_api.api_v1.auth.revocation import revocation_list
+from effective_mobile_fast_api.api_v1.auth.security import refresh_coalescer, token_cache
+from effective_mobile_fast_api.api_v1.auth.throttling import login_throttle
+from effective_mobile_fast_api.api_v1.business.sales_rollup import read_sales_stats, rebuild_sales_rollups
+from effective_mobile_fast_api.core.access_control import bump_policy_version, permission_matrix
+from effective_mobile_fast_api.core.db import get_db, get_read_db, paginate
+from effective_mobile_fast_api.core.entities.pagination import Page, PageParams, page_params
+from effective_mobile_fast_api.core.models import db_helper
 from effective_mobile_fast_api.core.entities.users import (
     RoleCreate, RoleRead, PermissionCreate, PermissionRead,
-    UserRoleCreate, UserRoleRead, RolePermissionCreate, RolePermissionRead
+    UserRoleCreate, UserRoleRead, RolePermissionCreate, RolePermissionRead, SalesStats
 )
 from effective_mobile_fast_api.core.models.tables import (
     Role, Permission, UserRole, RolePermission, User
@@ -37,28 +48,27 @@ async def create_role(
     
     role = Role(**role_data.model_dump())
     session.add(role)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
     await session.refresh(role)
     
     return role
 
 
-@router.get("/roles/", response_model=List[RoleRead])
+@router.get("/roles/", response_model=Page[RoleRead])
 async def get_roles(
+    page: PageParams = Depends(page_params),
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
-    """Получить все роли"""
-    query = select(Role)
-    result = await session.execute(query)
-    roles = result.scalars().all()
-    
-    return list(roles)
+    """Получить страницу ролей"""
+    return await paginate(session, select(Role), Role.id, page)
 
 
 @router.get("/roles/{role_id}/", response_model=RoleRead)
 async def get_role(
-    role_id: int,
+    role_id: uuid.UUID,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -95,23 +105,22 @@ async def create_permission(
     
     permission = Permission(**permission_data.model_dump())
     session.add(permission)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
     await session.refresh(permission)
     
     return permission
 
 
-@router.get("/permissions/", response_model=List[PermissionRead])
+@router.get("/permissions/", response_model=Page[PermissionRead])
 async def get_permissions(
+    page: PageParams = Depends(page_params),
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
-    """Получить все разрешения"""
-    query = select(Permission)
-    result = await session.execute(query)
-    permissions = result.scalars().all()
-    
-    return list(permissions)
+    """Получить страницу разрешений"""
+    return await paginate(session, select(Permission), Permission.id, page)
 
 
 # Управление ролями пользователей
@@ -154,7 +163,9 @@ async def assign_role_to_user(
     
     user_role = UserRole(**user_role_data.model_dump())
     session.add(user_role)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
     await session.refresh(user_role)
     
     # Загружаем связанную роль для ответа
@@ -165,7 +176,7 @@ async def assign_role_to_user(
 
 @router.delete("/user-roles/{user_role_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_role_from_user(
-    user_role_id: int,
+    user_role_id: uuid.UUID,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -179,7 +190,9 @@ async def remove_role_from_user(
         )
     
     await session.delete(user_role)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
 
 
 # Управление разрешениями ролей
@@ -222,7 +235,9 @@ async def assign_permission_to_role(
     
     role_permission = RolePermission(**role_permission_data.model_dump())
     session.add(role_permission)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
     await session.refresh(role_permission)
     
     # Загружаем связанное разрешение для ответа
@@ -233,7 +248,7 @@ async def assign_permission_to_role(
 
 @router.delete("/role-permissions/{role_permission_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_permission_from_role(
-    role_permission_id: int,
+    role_permission_id: uuid.UUID,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -247,31 +262,30 @@ async def remove_permission_from_role(
         )
     
     await session.delete(role_permission)
+    await bump_policy_version(session)
     await session.commit()
+    permission_matrix.invalidate()
 
 
 # Получение информации о пользователях и их ролях
-@router.get("/users/", response_model=List[dict])
+@router.get("/users/", response_model=Page[dict])
 async def get_users_with_roles(
+    page: PageParams = Depends(page_params),
     current_user=Depends(require_admin),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
-    """Получить всех пользователей с их ролями"""
-    query = select(User).where(User.status == "active")
-    result = await session.execute(query)
-    users = result.scalars().all()
+    """Получить страницу пользователей с их ролями"""
+    # Связи пользователь → роли загружаются двумя дополнительными запросами (IN), а не на каждого пользователя
+    query = (
+        select(User)
+        .where(User.status == "active")
+        .options(selectinload(User.user_roles).selectinload(UserRole.role))
+    )
+    users_page = await paginate(session, query, User.id, page)
     
     users_with_roles = []
-    for user in users:
-        # Получаем роли пользователя
-        user_roles_query = select(UserRole).where(UserRole.user_id == user.id)
-        user_roles_result = await session.execute(user_roles_query)
-        user_roles = user_roles_result.scalars().all()
-        
-        roles = []
-        for user_role in user_roles:
-            await session.refresh(user_role, ['role'])
-            roles.append(user_role.role.name)
+    for user in users_page.items:
+        roles = [user_role.role.name for user_role in user.user_roles]
         
         users_with_roles.append({
             "id": user.id,
@@ -282,4 +296,70 @@ async def get_users_with_roles(
             "roles": roles
         })
     
-    return users_with_roles
+    return Page(items=users_with_roles, next_cursor=users_page.next_cursor)
+
+
+# Выгрузки CSV (COPY ... TO STDOUT)
+@router.get("/exports/orders/")
+async def export_orders(
+    request: Request,
+    current_user=Depends(require_admin)
+):
+    """Выгрузить все заказы с названием и ценой продукта в CSV"""
+    return csv_export_response(request, lambda dialect_name: orders_export_query(), "orders.csv")
+
+
+@router.get("/exports/users/")
+async def export_users(
+    request: Request,
+    current_user=Depends(require_admin)
+):
+    """Выгрузить всех пользователей с их ролями в CSV"""
+    return csv_export_response(request, users_export_query, "users.csv")
+
+
+# Аналитика продаж (только из таблицы итогов salesrollups)
+@router.get("/stats/", response_model=SalesStats)
+async def get_sales_stats(
+    top: int = Query(10, ge=1, le=100, description="Сколько продуктов, категорий и пользователей вернуть в топах"),
+    current_user=Depends(require_admin),
+    session: AsyncSession = Depends(get_read_db)
+):
+    """Выручка и число заказов: итог, по статусам и топы по продуктам, категориям и пользователям"""
+    return await read_sales_stats(session, top)
+
+
+@router.post("/stats/rebuild/", response_model=SalesStats)
+async def rebuild_sales_stats(
+    current_user=Depends(require_admin),
+    session: AsyncSession = Depends(get_db)
+):
+    """Пересчитать итоги продаж по таблице заказов (полный проход по orders)"""
+    await rebuild_sales_rollups(session)
+    return await read_sales_stats(session, 10)
+
+
+# Метрики внутренних кэшей
+@router.get("/metrics/")
+async def get_metrics(
+    current_user=Depends(require_admin)
+):
+    """Получить метрики внутренних кэшей"""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "permission_matrix": permission_matrix.stats(),
+        "password_hasher": password_hasher.stats(),
+        "jwt_cache": token_cache.stats(),
+        "token_refresh": refresh_coalescer.stats(),
+        "login_throttle": login_throttle.stats(),
+        "token_revocation": revocation_list.stats(),
+        "db_pool": db_helper.pool_stats(),
+    }
+
+
+@router.get("/metrics/db-pool/")
+async def get_db_pool_metrics(
+    current_user=Depends(require_admin)
+):
+    """Получить состояние пула соединений с БД"""
+    return db_helper.pool_stats()
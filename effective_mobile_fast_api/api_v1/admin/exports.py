@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import csv
+import io
+from typing import AsyncIterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, func, literal, select
+
+from effective_mobile_fast_api.core.models import db_helper
+from effective_mobile_fast_api.core.models.tables import Order, Product, Role, User, UserRole
+
+# Сколько чанков COPY может ждать отправки клиенту; дальше COPY ждет, пока клиент прочитает
+EXPORT_QUEUE_CHUNKS = 16
+# Размер пачки строк для запасного пути без COPY (не PostgreSQL)
+EXPORT_FALLBACK_BATCH_SIZE = 1000
+
+
+def orders_export_query() -> Select:
+    """Заказы с названием и ценой продукта"""
+    return (
+        select(
+            Order.id, Order.user_id, Order.product_id,
+            Product.name.label("product_name"), Product.price.label("product_price"),
+            Order.quantity, Order.total_amount, Order.status
+        )
+        .join(Product, Product.id == Order.product_id)
+        .order_by(Order.id)
+    )
+
+
+def users_export_query(dialect_name: str) -> Select:
+    """Пользователи со списком ролей через «;»"""
+    if dialect_name == "postgresql":
+        roles = func.string_agg(Role.name, literal(";"))
+    else:
+        roles = func.group_concat(Role.name, ";")
+    return (
+        select(
+            User.id, User.first_name, User.last_name, User.middle_name, User.email, User.status,
+            func.coalesce(roles, "").label("roles")
+        )
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .group_by(User.id)
+        .order_by(User.id)
+    )
+
+
+async def _copy_to_stdout(driver_connection, sql: str) -> AsyncIterator[bytes]:
+    """COPY (...) TO STDOUT: чанки из asyncpg передаются клиенту через ограниченную очередь"""
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+
+    async def produce():
+        try:
+            await driver_connection.copy_from_query(sql, output=queue.put, format="csv", header=True)
+        except asyncio.CancelledError:
+            # Потребитель ушел (клиент отключился): конца потока никто не ждет, а очередь может быть полна
+            raise
+        except BaseException:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        # Пробрасываем ошибку COPY, если она была
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            # Соединение возвращается в пул только после остановки COPY
+            with contextlib.suppress(asyncio.CancelledError):
+                await producer
+
+
+async def _stream_csv_rows(session, query: Select) -> AsyncIterator[str]:
+    """Запасной путь без COPY: строки читаются серверным курсором и пишутся в CSV пачками"""
+    result = await session.stream(query.execution_options(yield_per=EXPORT_FALLBACK_BATCH_SIZE))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    async for rows in result.partitions():
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _export_chunks(request: Request, build_query) -> AsyncIterator[bytes | str]:
+    # Соединение берется внутри генератора: сессия из зависимости закрывается до отправки тела
+    async with db_helper.read_session_for(request) as session:
+        connection = await session.connection()
+        query = build_query(connection.dialect.name)
+
+        if connection.dialect.driver != "asyncpg":
+            async for chunk in _stream_csv_rows(session, query):
+                yield chunk
+            return
+
+        sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+        raw_connection = await connection.get_raw_connection()
+        async for chunk in _copy_to_stdout(raw_connection.driver_connection, sql):
+            yield chunk
+
+
+def csv_export_response(request: Request, build_query, filename: str) -> StreamingResponse:
+    """Потоковая выгрузка CSV: строки не собираются в памяти процесса"""
+    return StreamingResponse(
+        _export_chunks(request, build_query),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,2 +1,2 @@
 # Экспорт зависимостей для удобства импорта
-from .dependencies import get_user_strict, require_admin, require_permission
+from .dependencies import get_user_strict, get_authz_context, require_admin, require_permission
@@ -1,29 +1,40 @@
-from sqlalchemy import select
+import uuid
+
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from effective_mobile_fast_api.core.models.base import as_uuid
 from effective_mobile_fast_api.core.models.tables import User, Role, UserRole
 from effective_mobile_fast_api.core.entities.users import UserCreate, UserCreateDB
-from effective_mobile_fast_api.api_v1.auth.security import hash_password
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
+
+
+# Запросы собираются один раз при импорте: SQLAlchemy компилирует их однократно,
+# а одинаковый SQL позволяет asyncpg переиспользовать подготовленные выражения
+USER_BY_EMAIL_STATEMENT = select(User).where(User.email == bindparam("email"))
+USER_BY_ID_STATEMENT = select(User).where(User.id == bindparam("user_id"))
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
     """Получить пользователя по email"""
-    statement = select(User).where(User.email == email)
-    result = await session.execute(statement)
+    result = await session.execute(USER_BY_EMAIL_STATEMENT, {"email": email})
     return result.scalar_one_or_none()
 
 
-async def get_user_by_id(session: AsyncSession, user_id: str) -> User | None:
+async def get_user_by_id(session: AsyncSession, user_id: str | uuid.UUID) -> User | None:
     """Получить пользователя по ID"""
-    statement = select(User).where(User.id == user_id)
-    result = await session.execute(statement)
+    try:
+        user_id = as_uuid(user_id)
+    except ValueError:
+        return None
+    result = await session.execute(USER_BY_ID_STATEMENT, {"user_id": user_id})
     return result.scalar_one_or_none()
 
 
 async def create_user_db(session: AsyncSession, user_data: UserCreate) -> User:
     """Создать нового пользователя в БД"""
     # Хешируем пароль
-    password_hash = hash_password(user_data.password)
+    password_hash = await password_hasher.hash(user_data.password)
     
     # Создаем объект пользователя
     user_create_db = UserCreateDB(
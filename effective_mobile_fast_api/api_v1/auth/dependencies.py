@@ -2,9 +2,27 @@ from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from effective_mobile_fast_api.api_v1.auth.crud import get_user_by_id
+from effective_mobile_fast_api.core.cache import LRUCache
+from effective_mobile_fast_api.core.config import settings
 from effective_mobile_fast_api.core.db import get_db
 from effective_mobile_fast_api.core.entities.users import UserPublic
-from effective_mobile_fast_api.core.access_control import AccessControlService
+from effective_mobile_fast_api.core.models.tables import UserStatus
+from effective_mobile_fast_api.core.access_control import AuthzContext, permission_matrix
+
+# Кэш пользователей по id: (версия политики, пользователь). Изменение или удаление
+# пользователя увеличивает версию политики в БД, поэтому запись устаревает во всех процессах
+principal_cache = LRUCache(
+    max_size=settings.principal_cache_max_size,
+    ttl=settings.principal_cache_ttl_seconds
+)
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Удалить пользователя из кэша процесса после commit изменения его данных или статуса.
+
+    Другие процессы узнают об изменении по версии политики: перед commit вызывайте bump_policy_version().
+    """
+    principal_cache.pop(str(user_id))
 
 
 async def get_user_soft(
@@ -16,11 +34,20 @@ async def get_user_soft(
     if user_id is None:
         return None  # Гость или неавторизованный пользователь
 
+    # Версия сверяется с БД не чаще RBAC_POLICY_CHECK_SECONDS
+    await permission_matrix.refresh(session)
+    version = permission_matrix.version
+    cached = principal_cache.get(str(user_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
     user = await get_user_by_id(session, user_id)
-    if not user:
+    # Удаленный пользователь не авторизован и с еще действующим токеном
+    if not user or user.status == UserStatus.deleted:
         return None
     
     user_public = UserPublic.model_validate(user)
+    principal_cache.set(str(user_id), (version, user_public))
     return user_public
 
 
@@ -44,15 +71,37 @@ async def get_user_strict(
     return user
 
 
+async def get_authz_soft(
+        request: Request,
+        user: UserPublic | None = Depends(get_user_soft),
+        session: AsyncSession = Depends(get_db)
+) -> AuthzContext | None:
+    """Получить роли и разрешения пользователя один раз на запрос (None для гостя)"""
+    if user is None:
+        return None
+
+    # Права из access-токена, если версия политики в нем совпадает с версией в БД
+    await permission_matrix.refresh(session)
+    grants = permission_matrix.decode_claim(getattr(request.state, "authz", None))
+    if grants is None:
+        grants = await permission_matrix.get_user_grants(session, user.id)
+    return AuthzContext(grants)
+
+
+async def get_authz_context(
+        current_user: UserPublic = Depends(get_user_strict),
+        authz: AuthzContext | None = Depends(get_authz_soft)
+) -> AuthzContext:
+    """Получить права обязательно авторизованного пользователя"""
+    return authz
+
+
 async def require_admin(
         current_user: UserPublic = Depends(get_user_strict),
-        session: AsyncSession = Depends(get_db)
+        authz: AuthzContext = Depends(get_authz_context)
 ):
     """Проверить, что пользователь является администратором"""
-    access_control = AccessControlService(session)
-    is_admin = await access_control.is_admin(current_user.id)
-    
-    if not is_admin:
+    if not authz.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
@@ -64,13 +113,10 @@ def require_permission(resource: str, action: str):
     """Фабрика для создания зависимости проверки разрешений"""
     async def _require_permission(
             current_user: UserPublic = Depends(get_user_strict),
-            session: AsyncSession = Depends(get_db)
+            authz: AuthzContext = Depends(get_authz_context)
     ):
         """Проверить, что у пользователя есть определенное разрешение"""
-        access_control = AccessControlService(session)
-        has_permission = await access_control.has_permission(current_user.id, resource, action)
-        
-        if not has_permission:
+        if not authz.can(resource, action):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required permission: {action} on {resource}"
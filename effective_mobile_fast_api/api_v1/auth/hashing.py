@@ -0,0 +1,220 @@
+import asyncio
+import math
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from sqlalchemy import update
+
+from effective_mobile_fast_api.api_v1.auth.security import (
+    configure_pwd_context, ensure_pwd_context, hash_password, pwd_context, pwd_context_options, verify_password
+)
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.models import db_helper
+from effective_mobile_fast_api.core.models.tables import User
+
+BCRYPT_MAX_ROUNDS = 16
+BCRYPT_PROBE_ROUNDS = 8
+ARGON2_MAX_TIME_COST = 10
+
+
+# Функции для пула: параметры контекста передаются явно, чтобы процессы пула
+# использовали ту же схему и стоимость, что и основной процесс
+def _hash_with_options(options: dict, password: str) -> str:
+    ensure_pwd_context(options)
+    return hash_password(password)
+
+
+def _verify_with_options(options: dict, plain_password: str, hashed_password: str) -> bool:
+    ensure_pwd_context(options)
+    return verify_password(plain_password, hashed_password)
+
+
+def _measure_verify_ms(handler, secret: str = "calibration-probe", samples: int = 3) -> float:
+    """Лучшее из нескольких замеров времени проверки хеша"""
+    probe_hash = handler.hash(secret)
+    best = math.inf
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        handler.verify(secret, probe_hash)
+        best = min(best, time.perf_counter() - started_at)
+    return best * 1000
+
+
+def _scheme_handler(scheme: str, argon2_memory_cost: int):
+    if scheme == "argon2":
+        from passlib.hash import argon2
+        if not argon2.has_backend():
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 requires the argon2-cffi package")
+        return argon2.using(memory_cost=argon2_memory_cost)
+    if scheme == "bcrypt":
+        from passlib.hash import bcrypt
+        return bcrypt
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def pwd_options(scheme: str, rounds: int, argon2_memory_cost: int) -> dict:
+    """Параметры pwd_context для заданной стоимости (bcrypt rounds / argon2 time_cost).
+
+    Стоимость не опускается ниже значения библиотеки по умолчанию и задается только
+    нижней границей: хеши слабее пересчитываются при входе, более стойкие не трогаются.
+    Все процессы получают ее из настроек, поэтому не пересчитывают хеши друг друга.
+    """
+    handler = _scheme_handler(scheme, argon2_memory_cost)
+    rounds = max(rounds, handler.default_rounds)
+    if scheme == "argon2":
+        return {
+            "schemes": ["argon2", "bcrypt"],
+            "deprecated": ["bcrypt"],
+            "argon2__memory_cost": argon2_memory_cost,
+            "argon2__default_rounds": rounds,
+            "argon2__min_rounds": rounds,
+        }
+    return {
+        "schemes": ["bcrypt"],
+        "deprecated": "auto",
+        "bcrypt__default_rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+    }
+
+
+def calibrate_rounds(scheme: str, target_ms: float, argon2_memory_cost: int) -> int:
+    """Стоимость, при которой проверка пароля на этой машине занимает около target_ms (для настройки, не при старте)"""
+    handler = _scheme_handler(scheme, argon2_memory_cost)
+    if scheme == "argon2":
+        probe_ms = _measure_verify_ms(handler.using(time_cost=1))
+        return max(1, min(ARGON2_MAX_TIME_COST, int(target_ms // probe_ms)))
+
+    # Каждый следующий раунд bcrypt удваивает стоимость
+    probe_ms = _measure_verify_ms(handler.using(rounds=BCRYPT_PROBE_ROUNDS))
+    rounds = BCRYPT_PROBE_ROUNDS + math.floor(math.log2(target_ms / probe_ms))
+    return max(handler.min_rounds, min(BCRYPT_MAX_ROUNDS, rounds))
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей в ограниченном пуле потоков или процессов.
+
+    bcrypt занимает 100–300 мс CPU, поэтому синхронный вызов в async-обработчике
+    блокирует event loop. Здесь вызовы уходят в пул, а семафор ограничивает число
+    одновременных операций: при всплеске логинов запросы ждут в очереди, не мешая
+    остальным обработчикам.
+    """
+
+    def __init__(self, workers: int, executor: str = "thread", max_concurrency: int | None = None):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.workers = workers
+        self.executor_type = executor
+        self.max_concurrency = max_concurrency or workers
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Метрики
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+        self.rehashed = 0
+        self._background: set[asyncio.Task] = set()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func, *args):
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        self.wait_seconds_total += started_at - queued_at
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.run_seconds_total += time.perf_counter() - started_at
+            self._semaphore.release()
+
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Хеширование пароля в пуле"""
+        return await self._run(_hash_with_options, dict(pwd_context_options), password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля в пуле"""
+        return await self._run(_verify_with_options, dict(pwd_context_options), plain_password, hashed_password)
+
+    def configure(self, scheme: str, rounds: int, argon2_memory_cost: int) -> dict:
+        """Применить схему и стоимость хеширования из настроек (процессы пула получают их с каждым вызовом)"""
+        options = pwd_options(scheme, rounds, argon2_memory_cost)
+        configure_pwd_context(options)
+        return options
+
+    def schedule_rehash(self, user_id: uuid.UUID, password: str, current_hash: str) -> None:
+        """После успешного входа пересчитать в фоне хеш с устаревшими параметрами"""
+        if not pwd_context.needs_update(current_hash):
+            return
+        task = asyncio.create_task(self._rehash(user_id, password, current_hash))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _rehash(self, user_id: uuid.UUID, password: str, current_hash: str) -> None:
+        new_hash = await self.hash(password)
+        async with db_helper.session_factory() as session:
+            # Условие по старому хешу не перезапишет пароль, измененный за это время
+            await session.execute(
+                update(User)
+                .where(User.id == user_id, User.password_hash == current_hash)
+                .values(password_hash=new_hash)
+            )
+            await session.commit()
+        self.rehashed += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """Глубина очереди и время ожидания/выполнения операций"""
+        finished = self.completed + self.failed
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_seconds_total / finished * 1000, 2) if finished else 0.0,
+            "avg_run_ms": round(self.run_seconds_total / finished * 1000, 2) if finished else 0.0,
+            "rehashed": self.rehashed,
+            "scheme": pwd_context.default_scheme(),
+            "options": {key: value for key, value in pwd_context_options.items() if "__" in key},
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    executor=settings.password_hash_executor,
+    max_concurrency=settings.password_hash_max_concurrency
+)
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import math
+from datetime import datetime, timezone
+
+from fastapi import Request
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from effective_mobile_fast_api.api_v1.auth.security import decode_jwt_payload
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.models import db_helper
+from effective_mobile_fast_api.core.models.tables import RevokedToken
+
+
+def request_tokens(request: Request) -> list[str | None]:
+    """Токены запроса: из cookies и пара, выпущенная middleware при обновлении в этом же запросе"""
+    tokens = [request.cookies.get("access_token"), request.cookies.get("refresh_token")]
+    tokens.extend(getattr(request.state, "issued_tokens", ()))
+    return tokens
+
+
+class BloomFilter:
+    """Bloom-фильтр фиксированного размера, рассчитанный на capacity элементов с долей ложных срабатываний fp_rate"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.size_bits = max(8, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Двойное хеширование: k позиций из двух половин одного sha256
+        digest = hashlib.sha256(item.encode()).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size_bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        """Ожидаемая доля ложных срабатываний при текущем заполнении"""
+        return (1 - math.exp(-self.hash_count * self.count / self.size_bits)) ** self.hash_count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+class TokenRevocationList:
+    """Список отозванных токенов: таблица revokedtokens + Bloom-фильтр в памяти процесса.
+
+    Почти все токены не отозваны, и для них фильтр отвечает «нет» без обращения
+    к БД. Запрос в таблицу выполняется только при срабатывании фильтра. Фильтр
+    периодически перестраивается из таблицы: так в него попадают отзывы,
+    сделанные другими воркерами, а истекшие записи удаляются.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self._filter = BloomFilter(capacity, fp_rate)
+        # jti, отозванные во время перестроения, — их нужно перенести в новый фильтр
+        self._revoked_during_rebuild: list[str] | None = None
+
+        # Метрики
+        self.checks = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+        self.revoked = 0
+        self.rebuilds = 0
+        self.rebuild_errors = 0
+        self.last_rebuild_error: str | None = None
+
+    async def revoke_tokens(self, session: AsyncSession, *token_strings: str | None) -> int:
+        """Отозвать токены до момента их истечения; вернуть число отозванных"""
+        revoked = []
+        for token_string in token_strings:
+            payload = decode_jwt_payload(token_string)
+            if not payload or not payload.get("jti") or payload.get("exp") is None:
+                continue
+            jti = payload["jti"]
+            if await session.get(RevokedToken, jti) is None:
+                expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None)
+                session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            revoked.append(jti)
+        if not revoked:
+            return 0
+        await session.commit()
+
+        for jti in revoked:
+            self._filter.add(jti)
+            if self._revoked_during_rebuild is not None:
+                self._revoked_during_rebuild.append(jti)
+        self.revoked += len(revoked)
+        return len(revoked)
+
+    async def is_revoked(self, jti: str | None) -> bool:
+        """Проверить, отозван ли токен; БД запрашивается только при срабатывании фильтра"""
+        if not jti:
+            return False
+        self.checks += 1
+        if jti not in self._filter:
+            return False
+
+        self.filter_hits += 1
+        async with db_helper.session_factory() as session:
+            revoked = await session.get(RevokedToken, jti) is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def rebuild(self) -> None:
+        """Перестроить фильтр из таблицы, удалив истекшие записи"""
+        self._revoked_during_rebuild = []
+        try:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            async with db_helper.session_factory() as session:
+                await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+                await session.commit()
+                result = await session.execute(select(RevokedToken.jti))
+                jtis = result.scalars().all()
+
+            # При переполнении фильтр растет, чтобы не превысить заданную долю ложных срабатываний
+            bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.fp_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            for jti in self._revoked_during_rebuild:
+                bloom.add(jti)
+            self._filter = bloom
+            self.rebuilds += 1
+        finally:
+            self._revoked_during_rebuild = None
+
+    async def run_periodic_rebuild(self, interval: float) -> None:
+        """Фоновая задача: перестраивать фильтр каждые interval секунд"""
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as exc:
+                # Недоступность БД не останавливает задачу: текущий фильтр остается в силе
+                self.rebuild_errors += 1
+                self.last_rebuild_error = str(exc)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """Заполнение и размер фильтра, ожидаемая и наблюдаемая доля ложных срабатываний"""
+        negatives = self.checks - (self.filter_hits - self.false_positives)
+        return {
+            "entries": self._filter.count,
+            "capacity": self._filter.capacity,
+            "hash_count": self._filter.hash_count,
+            "memory_bytes": self._filter.memory_bytes,
+            "estimated_fp_rate": round(self._filter.estimated_fp_rate, 6),
+            "observed_fp_rate": round(self.false_positives / negatives, 6) if negatives else 0.0,
+            "checks": self.checks,
+            "db_lookups": self.filter_hits,
+            "revoked": self.revoked,
+            "rebuilds": self.rebuilds,
+            "rebuild_errors": self.rebuild_errors,
+            "last_rebuild_error": self.last_rebuild_error,
+        }
+
+
+revocation_list = TokenRevocationList(
+    capacity=settings.token_revocation_capacity,
+    fp_rate=settings.token_revocation_fp_rate
+)
@@ -1,13 +1,26 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import deque
 from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
 
 from fastapi import Response
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from effective_mobile_fast_api.api_v1.auth.config import ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, SECRET_KEY
+from effective_mobile_fast_api.api_v1.auth.config import ALGORITHM, SECRET_KEY
+from effective_mobile_fast_api.core.cache import LRUCache
+from effective_mobile_fast_api.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Текущие параметры pwd_context; передаются в процессы пула хеширования
+pwd_context_options: dict = {"schemes": ["bcrypt"], "deprecated": "auto"}
+pwd_context = CryptContext(**pwd_context_options)
+
+# Кэш проверенных токенов: sha256(token) → payload, запись живет до exp токена
+token_cache = LRUCache(max_size=settings.jwt_cache_max_size)
 
 
 def set_auth_cookies(response: Response,
@@ -20,7 +33,7 @@ def set_auth_cookies(response: Response,
         httponly=True,
         secure=secure,
         samesite="lax",
-        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        max_age=settings.access_token_expire_minutes * 60
     )
     response.set_cookie(
         key="refresh_token",
@@ -28,7 +41,7 @@ def set_auth_cookies(response: Response,
         httponly=True,
         secure=secure,
         samesite="lax",
-        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+        max_age=settings.refresh_token_expire_days * 24 * 60 * 60
     )
 
 
@@ -36,40 +49,135 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
+def create_access_token(data: dict, expires_delta: timedelta | None = None, authz: dict | None = None):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    if authz:
+        # Компактный claim с правами: битовая маска, id ролей и версия политики
+        to_encode["authz"] = authz
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
-    to_encode.update({"exp": expire})
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=settings.refresh_token_expire_days))
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def generate_and_set_tokens(response: Response, user_id: str, secure: bool = False):
-    access_token = create_access_token({"sub": user_id})
+def create_token_pair(user_id: str, authz: dict | None = None) -> tuple[str, str]:
+    access_token = create_access_token({"sub": user_id}, authz=authz)
     refresh_token = create_refresh_token({"sub": user_id})
+    return access_token, refresh_token
+
+
+def generate_and_set_tokens(response: Response, user_id: str, secure: bool = False, authz: dict | None = None):
+    access_token, refresh_token = create_token_pair(user_id, authz=authz)
     set_auth_cookies(response, access_token, refresh_token, secure=secure)
     return access_token, refresh_token
 
 
-def decode_jwt_token(token_string: str) -> str | None:
+def decode_jwt_payload(token_string: str) -> dict | None:
     if not token_string:
         return None
+    token = token_string.removeprefix("Bearer ").strip()
+    cache_key = hashlib.sha256(token.encode()).digest()
+
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
     try:
-        token = token_string.removeprefix("Bearer ").strip()
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
 
+    # Кэшируем только токены со сроком действия, ровно до его окончания
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = exp - time.time()
+        if ttl > 0:
+            token_cache.set(cache_key, payload, ttl=ttl)
+    return payload
+
+
+def decode_jwt_token(token_string: str) -> str | None:
+    payload = decode_jwt_payload(token_string)
+    if payload is None:
+        return None
+    return payload.get("sub")
+
 
 def hash_password(password: str) -> str:
     """Хеширование пароля"""
     return pwd_context.hash(password)
+
+
+def configure_pwd_context(options: dict) -> None:
+    """Перенастроить схему и стоимость хеширования паролей"""
+    pwd_context.load(options)
+    pwd_context_options.clear()
+    pwd_context_options.update(options)
+
+
+def ensure_pwd_context(options: dict) -> None:
+    """Применить параметры, если они отличаются от текущих (для процессов пула хеширования)"""
+    if options != pwd_context_options:
+        configure_pwd_context(dict(options))
+
+
+class RefreshCoalescer:
+    """Single-flight обновление токенов.
+
+    Браузер после истечения access-токена шлет несколько параллельных запросов
+    (страница и статика) с одним refresh-токеном. Первый запрос выпускает новую пару,
+    остальные в течение окна получают ту же пару, а не подписывают свою.
+    """
+
+    RATE_WINDOW_SECONDS = 60
+
+    def __init__(self, window: float, max_size: int = 10000):
+        self._pairs = LRUCache(max_size=max_size, ttl=window)
+        self._minted_at: deque[float] = deque()
+        self.minted = 0
+        self.coalesced = 0
+
+    async def refresh(self, refresh_token: str, mint: Callable[[], Awaitable[tuple[str, str]]]) -> tuple[str, str]:
+        """Получить новую пару токенов для refresh-токена, выпуская ее не чаще раза за окно"""
+        key = hashlib.sha256(refresh_token.encode()).digest()
+        pending = self._pairs.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pairs.set(key, future)
+        try:
+            pair = await mint()
+        except BaseException as exc:
+            self._pairs.pop(key)
+            future.set_exception(exc)
+            future.exception()  # ошибку получат ожидающие запросы, не логируем ее повторно
+            raise
+
+        future.set_result(pair)
+        self.minted += 1
+        self._minted_at.append(time.monotonic())
+        return pair
+
+    def stats(self) -> dict:
+        """Число выпущенных и объединенных обновлений, средняя частота за последнюю минуту"""
+        border = time.monotonic() - self.RATE_WINDOW_SECONDS
+        while self._minted_at and self._minted_at[0] < border:
+            self._minted_at.popleft()
+        return {
+            "minted": self.minted,
+            "coalesced": self.coalesced,
+            "refreshes_per_second": round(len(self._minted_at) / self.RATE_WINDOW_SECONDS, 3),
+        }
+
+
+refresh_coalescer = RefreshCoalescer(window=settings.token_refresh_coalesce_seconds)
@@ -0,0 +1,152 @@
+import time
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional
+
+from effective_mobile_fast_api.core.cache import LRUCache
+from effective_mobile_fast_api.core.config import settings
+
+
+class AttemptState(NamedTuple):
+    """Состояние ключа: моменты попыток в окне, число блокировок подряд и конец текущей блокировки"""
+    attempts: tuple[float, ...]
+    strikes: int
+    locked_until: float
+
+
+class ThrottleBackend(ABC):
+    """Хранилище состояний лимитера.
+
+    Реализация по умолчанию хранит состояние в памяти процесса. Чтобы несколько
+    воркеров делили лимиты, достаточно подставить реализацию поверх общего
+    хранилища (например, Redis) в login_throttle.backend.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[AttemptState]:
+        """Состояние ключа или None, если попыток не было или запись истекла"""
+
+    @abstractmethod
+    async def set(self, key: str, state: AttemptState, ttl: float) -> None:
+        """Сохранить состояние ключа на ttl секунд"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Сбросить состояние ключа"""
+
+
+class MemoryThrottleBackend(ThrottleBackend):
+    """Хранилище состояний в памяти процесса (ограниченный LRU с TTL)"""
+
+    def __init__(self, max_keys: int):
+        self._states = LRUCache(max_size=max_keys)
+
+    async def get(self, key: str) -> Optional[AttemptState]:
+        return self._states.get(key)
+
+    async def set(self, key: str, state: AttemptState, ttl: float) -> None:
+        self._states.set(key, state, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._states.pop(key)
+
+
+class LoginThrottle:
+    """Ограничение попыток входа по аккаунту и по IP: скользящее окно + экспоненциальная блокировка.
+
+    Проверка выполняется до поиска пользователя и bcrypt, поэтому перебор паролей
+    не расходует CPU. Превышение лимита в окне блокирует ключ на
+    base * 2**strikes секунд (не больше max_backoff); успешный вход сбрасывает
+    счетчик аккаунта.
+    """
+
+    def __init__(
+            self,
+            backend: ThrottleBackend,
+            account_limit: int,
+            ip_limit: int,
+            window: float,
+            backoff_base: float,
+            backoff_max: float
+    ):
+        self.backend = backend
+        self.account_limit = account_limit
+        self.ip_limit = ip_limit
+        self.window = window
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.accepted = 0
+        self.rejected_account = 0
+        self.rejected_ip = 0
+
+    @staticmethod
+    def _account_key(email: str) -> str:
+        return f"account:{email.strip().lower()}"
+
+    @staticmethod
+    def _ip_key(ip: Optional[str]) -> str:
+        return f"ip:{ip or 'unknown'}"
+
+    async def _hit(self, key: str, limit: int, now: float) -> float:
+        """Учесть попытку по ключу; вернуть время до разблокировки (0 — попытка разрешена)"""
+        state = await self.backend.get(key) or AttemptState(attempts=(), strikes=0, locked_until=0.0)
+        if state.locked_until > now:
+            return state.locked_until - now
+
+        attempts = tuple(moment for moment in state.attempts if moment > now - self.window)
+        state_ttl = self.window + self.backoff_max
+
+        if len(attempts) >= limit:
+            backoff = min(self.backoff_base * 2 ** state.strikes, self.backoff_max)
+            await self.backend.set(
+                key,
+                AttemptState(attempts=(), strikes=state.strikes + 1, locked_until=now + backoff),
+                ttl=state_ttl
+            )
+            return backoff
+
+        await self.backend.set(
+            key,
+            AttemptState(attempts=attempts + (now,), strikes=state.strikes, locked_until=0.0),
+            ttl=state_ttl
+        )
+        return 0.0
+
+    async def acquire(self, email: str, ip: Optional[str]) -> float:
+        """Зарегистрировать попытку входа; вернуть Retry-After в секундах или 0, если попытка разрешена"""
+        now = time.time()
+
+        retry_after = await self._hit(self._ip_key(ip), self.ip_limit, now)
+        if retry_after:
+            self.rejected_ip += 1
+            return retry_after
+
+        retry_after = await self._hit(self._account_key(email), self.account_limit, now)
+        if retry_after:
+            self.rejected_account += 1
+            return retry_after
+
+        self.accepted += 1
+        return 0.0
+
+    async def reset_account(self, email: str) -> None:
+        """Сбросить счетчик аккаунта после успешного входа"""
+        await self.backend.delete(self._account_key(email))
+
+    def stats(self) -> dict:
+        """Число разрешенных и отклоненных попыток"""
+        return {
+            "accepted": self.accepted,
+            "rejected_account": self.rejected_account,
+            "rejected_ip": self.rejected_ip,
+        }
+
+
+login_throttle = LoginThrottle(
+    backend=MemoryThrottleBackend(max_keys=settings.login_throttle_max_keys),
+    account_limit=settings.login_attempts_per_account,
+    ip_limit=settings.login_attempts_per_ip,
+    window=settings.login_throttle_window_seconds,
+    backoff_base=settings.login_backoff_base_seconds,
+    backoff_max=settings.login_backoff_max_seconds
+)
@@ -1,10 +1,16 @@
-from fastapi import Depends, HTTPException, status, Cookie, Response, APIRouter
+import math
+
+from fastapi import Depends, HTTPException, status, Cookie, Request, Response, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from effective_mobile_fast_api.api_v1.auth.config import Production
-from effective_mobile_fast_api.api_v1.auth.security import verify_password, generate_and_set_tokens, decode_jwt_token
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
+from effective_mobile_fast_api.api_v1.auth.revocation import request_tokens, revocation_list
+from effective_mobile_fast_api.api_v1.auth.security import generate_and_set_tokens, decode_jwt_payload
+from effective_mobile_fast_api.api_v1.auth.throttling import login_throttle
+from effective_mobile_fast_api.core.access_control import build_authz_claim
 from effective_mobile_fast_api.core.db import get_db
 from effective_mobile_fast_api.core.models.tables import User, UserStatus
 from effective_mobile_fast_api.core.entities.users import UserCreate, UserCreateDB, UserRead
@@ -48,17 +54,27 @@ async def register(
 
 @router.post("/login/")
 async def login(
+    request: Request,
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: AsyncSession = Depends(get_db)
 ):
     """Вход в систему по email и паролю"""
+    # Отсекаем перебор до обращения к БД и bcrypt
+    retry_after = await login_throttle.acquire(form_data.username, request.client.host if request.client else None)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
     # Ищем пользователя по email
     query = select(User).where(User.email == form_data.username)
     result = await session.execute(query)
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await password_hasher.verify(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -71,7 +87,10 @@ async def login(
             detail="Account has been deleted"
         )
 
-    generate_and_set_tokens(response, str(user.id), secure=Production)
+    await login_throttle.reset_account(form_data.username)
+    password_hasher.schedule_rehash(user.id, form_data.password, user.password_hash)
+    authz = await build_authz_claim(session, str(user.id))
+    generate_and_set_tokens(response, str(user.id), secure=Production, authz=authz)
 
     return {"message": "Logged in successfully", "user_id": user.id}
 
@@ -79,24 +98,34 @@ async def login(
 @router.post("/refresh/")
 async def refresh_token(
         response: Response,
-        refresh_token: str | None = Cookie(default=None)
+        refresh_token: str | None = Cookie(default=None),
+        session: AsyncSession = Depends(get_db)
 ):
     """Обновление токенов доступа"""
-    user_id = decode_jwt_token(refresh_token)
+    payload = decode_jwt_payload(refresh_token)
+    if payload and await revocation_list.is_revoked(payload.get("jti")):
+        payload = None
+    user_id = payload.get("sub") if payload else None
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
     
-    generate_and_set_tokens(response, str(user_id), secure=Production)
+    authz = await build_authz_claim(session, str(user_id))
+    generate_and_set_tokens(response, str(user_id), secure=Production, authz=authz)
 
     return {"message": "Access and refresh tokens refreshed"}
 
 
 @router.post("/logout/", status_code=status.HTTP_204_NO_CONTENT)
-async def logout(response: Response):
-    """Выход из системы"""
+async def logout(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_db)
+):
+    """Выход из системы с отзывом текущих токенов"""
+    await revocation_list.revoke_tokens(session, *request_tokens(request))
     response.delete_cookie(key="access_token", httponly=True, samesite="lax", secure=Production)
     response.delete_cookie(key="refresh_token", httponly=True, samesite="lax", secure=Production)
     return {"message": "Logged out successfully"}
@@ -0,0 +1,89 @@
+import math
+from typing import Optional
+
+from sqlalchemy import Integer, cast, delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.db import dialect_insert
+from effective_mobile_fast_api.core.entities.users import CategoryFacet, PriceBucket, ProductFacets
+from effective_mobile_fast_api.core.models.tables import Product, ProductFacet
+
+
+def price_bucket(price: float) -> int:
+    """Номер интервала гистограммы для цены"""
+    return math.floor(price / settings.product_facet_price_bucket_width)
+
+
+async def apply_facet_delta(session: AsyncSession, category: str, price: float, delta: int) -> None:
+    """Изменить счетчик фасета в текущей транзакции; фиксируется вместе с изменением продукта"""
+    statement = dialect_insert(session)(ProductFacet).values(
+        category=category, price_bucket=price_bucket(price), product_count=delta
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProductFacet.category, ProductFacet.price_bucket],
+        set_={"product_count": ProductFacet.product_count + statement.excluded.product_count}
+    )
+    await session.execute(statement)
+
+
+async def move_product_facet(
+        session: AsyncSession,
+        old: Optional[tuple[str, float]],
+        new: Optional[tuple[str, float]]
+) -> None:
+    """Перенести продукт между фасетами: old/new — (категория, цена) до и после изменения, None — нет продукта"""
+    if old is not None and new is not None and (old[0], price_bucket(old[1])) == (new[0], price_bucket(new[1])):
+        return
+    if old is not None:
+        await apply_facet_delta(session, old[0], old[1], -1)
+    if new is not None:
+        await apply_facet_delta(session, new[0], new[1], 1)
+
+
+async def rebuild_facets(session: AsyncSession) -> None:
+    """Пересчитать агрегат по таблице products (после массового импорта и при старте приложения)"""
+    width = settings.product_facet_price_bucket_width
+    if session.bind.dialect.name == "postgresql":
+        # Дельты параллельных изменений ждут конца пересчета и применяются уже к новым значениям
+        await session.execute(text(f"LOCK TABLE {ProductFacet.__tablename__} IN EXCLUSIVE MODE"))
+        bucket = cast(func.floor(Product.price / width), Integer)
+    else:
+        # Цены неотрицательные, поэтому отбрасывание дробной части совпадает с floor
+        bucket = cast(Product.price / width, Integer)
+
+    await session.execute(delete(ProductFacet))
+    await session.execute(
+        dialect_insert(session)(ProductFacet).from_select(
+            ["category", "price_bucket", "product_count"],
+            select(Product.category, bucket, func.count()).group_by(Product.category, bucket)
+        )
+    )
+    await session.commit()
+
+
+async def read_facets(session: AsyncSession) -> ProductFacets:
+    """Счетчики категорий и гистограмма цен одним чтением небольшой таблицы агрегата"""
+    result = await session.execute(
+        select(ProductFacet.category, ProductFacet.price_bucket, ProductFacet.product_count)
+        .where(ProductFacet.product_count > 0)
+    )
+    categories: dict[str, int] = {}
+    buckets: dict[int, int] = {}
+    for category, bucket, count in result.all():
+        categories[category] = categories.get(category, 0) + count
+        buckets[bucket] = buckets.get(bucket, 0) + count
+
+    width = settings.product_facet_price_bucket_width
+    return ProductFacets(
+        total=sum(categories.values()),
+        bucket_width=width,
+        categories=[
+            CategoryFacet(category=category, count=count)
+            for category, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        price_histogram=[
+            PriceBucket(min_price=bucket * width, max_price=(bucket + 1) * width, count=count)
+            for bucket, count in sorted(buckets.items())
+        ],
+    )
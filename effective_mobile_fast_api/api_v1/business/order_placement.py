@@ -0,0 +1,126 @@
+import uuid
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, contains_eager
+
+from effective_mobile_fast_api.api_v1.business.sales_rollup import (
+    BY_CATEGORY, BY_PRODUCT, BY_STATUS, BY_USER, TOTAL, move_order_rollup, order_snapshot
+)
+from effective_mobile_fast_api.core.models.base import uuid7
+from effective_mobile_fast_api.core.models.tables import Order, Product, SalesRollup, User
+
+ORDER_COLUMNS = ["id", "user_id", "product_id", "quantity", "total_amount", "status", "category"]
+# Внешний ключ orders.user_id (имя PostgreSQL по умолчанию)
+ORDER_USER_FK = "orders_user_id_fkey"
+
+
+def _not_found(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+def _violated_constraint(exc: IntegrityError) -> str | None:
+    """Имя нарушенного ограничения из исключения asyncpg (None для других драйверов)"""
+    return getattr(exc.orig.__cause__, "constraint_name", None)
+
+
+def _priced_order(user_id: uuid.UUID, product_id: uuid.UUID, quantity: int, order_status: str):
+    """SELECT для INSERT: цена и категория берутся из products, total_amount считается в SQL"""
+    return (
+        select(
+            literal(uuid7(), Order.id.type), literal(user_id, Order.user_id.type), Product.id,
+            literal(quantity), Product.price * quantity, literal(order_status, Order.status.type), Product.category
+        )
+        .where(Product.id == product_id)
+    )
+
+
+def place_order_statement(user_id: uuid.UUID, product_id: uuid.UUID, quantity: int, order_status: str = "pending"):
+    """Один запрос PostgreSQL: INSERT ... SELECT заказа, upsert итогов продаж и возврат заказа с продуктом.
+
+    Несуществующий продукт дает пустой результат, несуществующий пользователь — нарушение внешнего ключа.
+    """
+    new_order = (
+        insert(Order)
+        .from_select(ORDER_COLUMNS, _priced_order(user_id, product_id, quantity, order_status))
+        .returning(*Order.__table__.c)
+        .cte("new_order")
+    )
+
+    # Итоги продаж обновляются в том же запросе (data-modifying CTE)
+    measures = (literal(1), new_order.c.quantity, new_order.c.total_amount)
+    rollup_rows = union_all(
+        select(literal(TOTAL), literal(""), *measures),
+        select(literal(BY_STATUS), new_order.c.status, *measures),
+        select(literal(BY_PRODUCT), new_order.c.product_id.cast(SalesRollup.key.type), *measures),
+        select(literal(BY_CATEGORY), new_order.c.category, *measures),
+        select(literal(BY_USER), new_order.c.user_id.cast(SalesRollup.key.type), *measures),
+    )
+    rollup = pg_insert(SalesRollup).from_select(
+        ["dimension", "key", "order_count", "quantity", "revenue"], rollup_rows
+    )
+    rollup = rollup.on_conflict_do_update(
+        index_elements=[SalesRollup.dimension, SalesRollup.key],
+        set_={
+            "order_count": SalesRollup.order_count + rollup.excluded.order_count,
+            "quantity": SalesRollup.quantity + rollup.excluded.quantity,
+            "revenue": SalesRollup.revenue + rollup.excluded.revenue,
+        }
+    ).cte("rollup")
+
+    placed = aliased(Order, new_order)
+    return (
+        select(placed)
+        .join(placed.product)
+        .options(contains_eager(placed.product))
+        .add_cte(rollup)
+    )
+
+
+async def _place_order_fallback(
+        session: AsyncSession, user_id: uuid.UUID, product_id: uuid.UUID, quantity: int, order_status: str
+) -> Order:
+    """SQLite при разработке: без data-modifying CTE, те же правила в несколько запросов"""
+    product = await session.get(Product, product_id)
+    if product is None:
+        raise _not_found("Product not found")
+    # SQLite по умолчанию не проверяет внешние ключи
+    if await session.get(User, user_id) is None:
+        raise _not_found("User not found")
+    order = Order(
+        user_id=user_id, product_id=product_id, quantity=quantity,
+        total_amount=product.price * quantity, status=order_status, category=product.category, product=product
+    )
+    session.add(order)
+    await move_order_rollup(session, None, await order_snapshot(session, order))
+    return order
+
+
+async def place_order(
+        session: AsyncSession, user_id: uuid.UUID, product_id: uuid.UUID, quantity: int, order_status: str = "pending"
+) -> Order:
+    """Оформить заказ по текущей цене продукта и зафиксировать его; 404, если нет продукта или пользователя"""
+    if quantity < 1:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Quantity must be at least 1")
+    try:
+        if session.bind.dialect.name == "postgresql":
+            result = await session.execute(place_order_statement(user_id, product_id, quantity, order_status))
+            order = result.unique().scalar_one_or_none()
+            if order is None:
+                raise _not_found("Product not found")
+        else:
+            order = await _place_order_fallback(session, user_id, product_id, quantity, order_status)
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        # Продукт уже найден в том же запросе; остальные нарушения — не ошибка клиента
+        if _violated_constraint(exc) == ORDER_USER_FK:
+            raise _not_found("User not found")
+        raise
+    except HTTPException:
+        await session.rollback()
+        raise
+    return order
@@ -0,0 +1,162 @@
+import codecs
+import csv
+import json
+import time
+import uuid
+from itertools import islice
+from typing import Iterator
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from effective_mobile_fast_api.core.db import dialect_insert
+from effective_mobile_fast_api.core.entities.users import ProductImportError, ProductImportRow, ProductImportSummary
+from effective_mobile_fast_api.core.models.base import uuid7
+from effective_mobile_fast_api.core.models.tables import Product
+
+IMPORT_BATCH_SIZE = 1000
+# Сколько ошибок по строкам возвращать в ответе
+MAX_REPORTED_ERRORS = 100
+IMPORT_COLUMNS = ("id", "name", "description", "price", "category")
+STAGING_TABLE = "products_import"
+
+
+def detect_import_format(upload: UploadFile) -> str:
+    """csv или ndjson по типу содержимого или расширению файла"""
+    content_type = (upload.content_type or "").lower()
+    filename = (upload.filename or "").lower()
+    if "ndjson" in content_type or "jsonl" in content_type or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def _iter_raw_rows(upload: UploadFile, import_format: str) -> Iterator[dict | Exception]:
+    """Построчное чтение загруженного файла без загрузки его целиком в память (блокирующее, см. _read_raw_rows)"""
+    lines = codecs.getreader("utf-8-sig")(upload.file)
+    if import_format == "csv":
+        yield from csv.DictReader(lines)
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield exc
+
+
+async def _read_raw_rows(rows: Iterator[dict | Exception]) -> list[dict | Exception]:
+    """Следующая пачка строк: чтение файла и разбор CSV/JSON идут в пуле потоков, не блокируя event loop"""
+    return await run_in_threadpool(lambda: list(islice(rows, IMPORT_BATCH_SIZE)))
+
+
+def _format_errors(exc: Exception) -> list[str]:
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+    return [str(exc)]
+
+
+class ProductImporter:
+    """Загрузка продуктов пачками: валидация по ProductCreate, COPY во временную таблицу и upsert по id.
+
+    Для PostgreSQL строки пачки передаются через asyncpg copy_records_to_table, после чего
+    одним INSERT ... ON CONFLICT (id) DO UPDATE переносятся в products. Для других БД
+    (SQLite при разработке) используется пакетный upsert через SQLAlchemy.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[ProductImportError] = []
+        self._staging_ready = False
+
+    def _record_error(self, row_number: int, exc: Exception) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ProductImportError(row=row_number, errors=_format_errors(exc)))
+
+    async def _copy_batch(self, records: list[tuple]) -> None:
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        if not self._staging_ready:
+            await self.session.execute(text(
+                f"CREATE TEMP TABLE {STAGING_TABLE} "
+                f"(LIKE {Product.__tablename__} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ))
+            self._staging_ready = True
+        else:
+            await self.session.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+
+        await driver_connection.copy_records_to_table(STAGING_TABLE, records=records, columns=IMPORT_COLUMNS)
+        columns = ", ".join(IMPORT_COLUMNS)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in IMPORT_COLUMNS if column != "id")
+        await self.session.execute(text(
+            f"INSERT INTO {Product.__tablename__} ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        ))
+
+    async def _upsert_batch(self, records: list[tuple]) -> None:
+        statement = dialect_insert(self.session)(Product)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={column: statement.excluded[column] for column in IMPORT_COLUMNS if column != "id"}
+        )
+        await self.session.execute(statement, [dict(zip(IMPORT_COLUMNS, record)) for record in records])
+
+    async def _flush(self, batch: dict[uuid.UUID, tuple]) -> None:
+        if not batch:
+            return
+        records = list(batch.values())
+        if self.session.bind.dialect.driver == "asyncpg":
+            await self._copy_batch(records)
+        else:
+            await self._upsert_batch(records)
+        self.imported += len(records)
+
+    async def run(self, upload: UploadFile) -> ProductImportSummary:
+        import_format = detect_import_format(upload)
+        started_at = time.perf_counter()
+        rows_total = 0
+        # Пачка по id: повтор id внутри пачки оставляет последнюю строку
+        batch: dict[uuid.UUID, tuple] = {}
+
+        raw_rows = _iter_raw_rows(upload, import_format)
+        while chunk := await _read_raw_rows(raw_rows):
+            for raw_row in chunk:
+                rows_total += 1
+                if isinstance(raw_row, Exception):
+                    self._record_error(rows_total, raw_row)
+                    continue
+                try:
+                    row = ProductImportRow.model_validate(raw_row)
+                except ValidationError as exc:
+                    self._record_error(rows_total, exc)
+                    continue
+
+                product_id = row.id or uuid7()
+                batch[product_id] = (product_id, row.name, row.description, row.price, row.category)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await self._flush(batch)
+                    batch = {}
+
+        await self._flush(batch)
+        await self.session.commit()
+
+        elapsed = time.perf_counter() - started_at
+        return ProductImportSummary(
+            format=import_format,
+            rows_total=rows_total,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors),
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(self.imported / elapsed, 1) if elapsed > 0 else 0.0,
+        )
@@ -0,0 +1,72 @@
+import re
+from typing import List
+
+from sqlalchemy import Float, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from effective_mobile_fast_api.core.models.tables import Product
+
+# Конфигурация текстового поиска: та же, что в генерируемой колонке products.search_vector
+SEARCH_CONFIG = "simple"
+# Не больше стольких слов запроса: длинный запрос только замедляет поиск
+MAX_QUERY_TERMS = 8
+
+SEARCH_VECTOR = literal_column(f"{Product.__tablename__}.search_vector", type_=TSVECTOR)
+_TERM_PATTERN = re.compile(r"[^\W_]+")
+
+
+def query_terms(q: str) -> list[str]:
+    """Слова запроса без знаков препинания и операторов tsquery"""
+    return _TERM_PATTERN.findall(q.lower())[:MAX_QUERY_TERMS]
+
+
+def prefix_tsquery(terms: list[str]) -> str:
+    """«ноутбук del» -> «ноутбук & del:*»: все слова обязательны, последнее может быть недописано"""
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+async def _search_postgresql(session: AsyncSession, terms: list[str], limit: int) -> List[Product]:
+    ts_query = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), prefix_tsquery(terms))
+    rank = func.ts_rank_cd(SEARCH_VECTOR, ts_query, type_=Float)
+    result = await session.execute(
+        select(Product)
+        .where(SEARCH_VECTOR.bool_op("@@")(ts_query))
+        .order_by(rank.desc(), Product.id)
+        .limit(limit)
+    )
+    products = list(result.scalars().all())
+    if products:
+        return products
+
+    # Ничего не нашлось — вероятно, опечатка: похожие по триграммам названия (индекс ix_products_name_trgm)
+    phrase = " ".join(terms)
+    result = await session.execute(
+        select(Product)
+        .where(Product.name.op("%>")(phrase))
+        .order_by(func.word_similarity(phrase, Product.name).desc(), Product.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def _search_like(session: AsyncSession, terms: list[str], limit: int) -> List[Product]:
+    """Запасной путь для SQLite при разработке: каждое слово встречается в одном из полей"""
+    query = select(Product)
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.where(or_(
+            Product.name.ilike(pattern), Product.category.ilike(pattern), Product.description.ilike(pattern)
+        ))
+    result = await session.execute(query.order_by(Product.name, Product.id).limit(limit))
+    return list(result.scalars().all())
+
+
+async def search_products(session: AsyncSession, q: str, limit: int) -> List[Product]:
+    """Поиск продуктов по названию, категории и описанию, самые релевантные первыми"""
+    terms = query_terms(q)
+    if not terms:
+        return []
+    if session.bind.dialect.name == "postgresql":
+        return await _search_postgresql(session, terms, limit)
+    return await _search_like(session, terms, limit)
@@ -0,0 +1,173 @@
+import uuid
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from effective_mobile_fast_api.core.db import dialect_insert
+from effective_mobile_fast_api.core.entities.users import SalesRollupRead, SalesStats
+from effective_mobile_fast_api.core.models.tables import Order, Product, SalesRollup, User
+
+TOTAL = "total"
+BY_STATUS = "status"
+BY_PRODUCT = "product"
+BY_CATEGORY = "category"
+BY_USER = "user"
+
+
+class OrderSnapshot(NamedTuple):
+    """Поля заказа, от которых зависят итоги продаж; категория — на момент оформления заказа"""
+    user_id: uuid.UUID
+    product_id: uuid.UUID
+    category: str
+    status: str
+    quantity: int
+    total_amount: float
+
+
+async def order_snapshot(session: AsyncSession, order: Order) -> OrderSnapshot:
+    """Снимок заказа; заказу без категории (новому или со сменой продукта) проставляется текущая категория продукта"""
+    if order.category is None:
+        product = await session.get(Product, order.product_id)
+        order.category = product.category if product else ""
+    return OrderSnapshot(
+        user_id=order.user_id,
+        product_id=order.product_id,
+        category=order.category,
+        status=order.status,
+        quantity=order.quantity,
+        total_amount=order.total_amount,
+    )
+
+
+def _rollup_keys(snapshot: OrderSnapshot) -> list[tuple[str, str]]:
+    return [
+        (TOTAL, ""),
+        (BY_STATUS, snapshot.status),
+        (BY_PRODUCT, str(snapshot.product_id)),
+        (BY_CATEGORY, snapshot.category),
+        (BY_USER, str(snapshot.user_id)),
+    ]
+
+
+async def move_order_rollup(
+        session: AsyncSession,
+        old: Optional[OrderSnapshot],
+        new: Optional[OrderSnapshot]
+) -> None:
+    """Применить разницу между старым и новым состоянием заказа (None — заказа нет) одним upsert-ом"""
+    deltas: dict[tuple[str, str], list] = {}
+    for snapshot, sign in ((old, -1), (new, 1)):
+        if snapshot is None:
+            continue
+        for rollup_key in _rollup_keys(snapshot):
+            delta = deltas.setdefault(rollup_key, [0, 0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * snapshot.quantity
+            delta[2] += sign * snapshot.total_amount
+
+    # Ключи, не изменившиеся между old и new, не трогаем; ON CONFLICT не допускает повторов ключа
+    rows = [
+        {"dimension": dimension, "key": key, "order_count": count, "quantity": quantity, "revenue": revenue}
+        for (dimension, key), (count, quantity, revenue) in deltas.items()
+        if count or quantity or revenue
+    ]
+    if not rows:
+        return
+    statement = dialect_insert(session)(SalesRollup).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SalesRollup.dimension, SalesRollup.key],
+        set_={
+            "order_count": SalesRollup.order_count + statement.excluded.order_count,
+            "quantity": SalesRollup.quantity + statement.excluded.quantity,
+            "revenue": SalesRollup.revenue + statement.excluded.revenue,
+        }
+    )
+    await session.execute(statement)
+
+
+async def rebuild_sales_rollups(session: AsyncSession) -> None:
+    """Пересчитать итоги по таблице orders (первичное заполнение и восстановление после сбоев)"""
+    # Категория из заказа; у заказов, созданных в обход приложения, — текущая категория продукта
+    order_category = func.coalesce(Order.category, Product.category)
+    measures = (func.count(), func.coalesce(func.sum(Order.quantity), 0), func.coalesce(func.sum(Order.total_amount), 0.0))
+    grouped = {
+        TOTAL: select(*measures),
+        BY_STATUS: select(Order.status, *measures).group_by(Order.status),
+        BY_PRODUCT: select(Order.product_id, *measures).group_by(Order.product_id),
+        BY_CATEGORY: select(order_category, *measures).join(Product, Product.id == Order.product_id)
+        .group_by(order_category),
+        BY_USER: select(Order.user_id, *measures).group_by(Order.user_id),
+    }
+
+    rows = []
+    for dimension, query in grouped.items():
+        for row in (await session.execute(query)).all():
+            # Ключ приводится к строке в Python, чтобы совпадать с ключами дельт на любой СУБД
+            key = "" if dimension == TOTAL else str(row[0])
+            order_count, quantity, revenue = row[-3:]
+            if order_count:
+                rows.append({
+                    "dimension": dimension, "key": key,
+                    "order_count": order_count, "quantity": quantity, "revenue": revenue
+                })
+
+    await session.execute(delete(SalesRollup))
+    if rows:
+        await session.execute(dialect_insert(session)(SalesRollup), rows)
+    await session.commit()
+
+
+async def ensure_sales_rollups(session: AsyncSession) -> None:
+    """Заполнить итоги при первом запуске; дальше они поддерживаются дельтами"""
+    has_rollups = (await session.execute(select(SalesRollup.dimension).limit(1))).first()
+    has_orders = (await session.execute(select(Order.id).limit(1))).first()
+    if has_orders and not has_rollups:
+        await rebuild_sales_rollups(session)
+
+
+def _read(row: SalesRollup, label: Optional[str] = None) -> SalesRollupRead:
+    return SalesRollupRead(
+        key=row.key, label=label, order_count=row.order_count, quantity=row.quantity, revenue=row.revenue
+    )
+
+
+async def _top(session: AsyncSession, dimension: str, limit: int) -> list[SalesRollup]:
+    result = await session.execute(
+        select(SalesRollup)
+        .where(SalesRollup.dimension == dimension, SalesRollup.order_count > 0)
+        .order_by(SalesRollup.revenue.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def read_sales_stats(session: AsyncSession, top: int) -> SalesStats:
+    """Итоги и топы по выручке; число прочитанных строк не зависит от размера orders"""
+    total = await session.get(SalesRollup, (TOTAL, ""))
+    by_status = await session.execute(
+        select(SalesRollup)
+        .where(SalesRollup.dimension == BY_STATUS, SalesRollup.order_count > 0)
+        .order_by(SalesRollup.key)
+    )
+    top_products = await _top(session, BY_PRODUCT, top)
+    top_categories = await _top(session, BY_CATEGORY, top)
+    top_users = await _top(session, BY_USER, top)
+
+    # Подписи для топов: по одному запросу IN на N ключей
+    product_ids = [uuid.UUID(row.key) for row in top_products]
+    user_ids = [uuid.UUID(row.key) for row in top_users]
+    product_names = dict((await session.execute(
+        select(Product.id, Product.name).where(Product.id.in_(product_ids))
+    )).all()) if product_ids else {}
+    user_emails = dict((await session.execute(
+        select(User.id, User.email).where(User.id.in_(user_ids))
+    )).all()) if user_ids else {}
+
+    return SalesStats(
+        total=_read(total) if total else SalesRollupRead(key="", order_count=0, quantity=0, revenue=0.0),
+        by_status=[_read(row) for row in by_status.scalars().all()],
+        top_products=[_read(row, product_names.get(uuid.UUID(row.key))) for row in top_products],
+        top_categories=[_read(row) for row in top_categories],
+        top_users=[_read(row, user_emails.get(uuid.UUID(row.key))) for row in top_users],
+    )
@@ -1,33 +1,80 @@
+import uuid
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
-from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, require_permission
-from effective_mobile_fast_api.core.db import get_db
-from effective_mobile_fast_api.core.entities.users import ProductRead, ProductCreate, OrderRead, OrderCreate
-from effective_mobile_fast_api.core.models.tables import Product, Order, User
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, require_admin, require_permission
+from effective_mobile_fast_api.api_v1.business.facets import move_product_facet, read_facets, rebuild_facets
+from effective_mobile_fast_api.api_v1.business.order_placement import place_order
+from effective_mobile_fast_api.api_v1.business.product_import import ProductImporter
+from effective_mobile_fast_api.api_v1.business.product_search import search_products
+from effective_mobile_fast_api.api_v1.business.sales_rollup import move_order_rollup, order_snapshot
+from effective_mobile_fast_api.core.db import get_db, get_for_update, get_read_db, paginate
+from effective_mobile_fast_api.core.entities.pagination import Page, PageParams, page_params
+from effective_mobile_fast_api.core.entities.users import (
+    ProductRead, ProductCreate, ProductFacets, ProductImportSummary, OrderRead, OrderCreate, OrderPlace
+)
+from effective_mobile_fast_api.core.models.tables import Product, Order
+from effective_mobile_fast_api.core.streaming import stream_collection, wants_ndjson
 
 router = APIRouter(tags=["Mock Business Objects"])
 
 
 # Управление продуктами
-@router.get("/products/", response_model=List[ProductRead])
+@router.get("/products/", response_model=Page[ProductRead])
 async def get_products(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    stream_all: bool = Query(False, alias="all", description="Выгрузить все продукты потоком (JSON-массив)"),
     current_user=Depends(require_permission("products", "read")),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
-    """Получить список всех продуктов (требует права на чтение продуктов)"""
+    """Получить страницу продуктов или выгрузить все потоком (требует права на чтение продуктов)"""
     query = select(Product)
-    result = await session.execute(query)
-    products = result.scalars().all()
-    
-    return list(products)
+    if stream_all or wants_ndjson(request):
+        return stream_collection(request, query.order_by(Product.id), ProductRead)
+    return await paginate(session, query, Product.id, page)
+
+
+@router.post("/products/import/", response_model=ProductImportSummary)
+async def import_products(
+    file: UploadFile = File(..., description="CSV (id,name,description,price,category) или NDJSON"),
+    current_user=Depends(require_admin),
+    session: AsyncSession = Depends(get_db)
+):
+    """Массовый импорт продуктов из CSV/NDJSON с upsert по id (только для администратора)"""
+    summary = await ProductImporter(session).run(file)
+    # Построчные дельты для upsert-а пачками дороже полного пересчета небольшого агрегата
+    await rebuild_facets(session)
+    return summary
+
+
+@router.get("/products/facets/", response_model=ProductFacets)
+async def get_product_facets(
+    current_user=Depends(require_permission("products", "read")),
+    session: AsyncSession = Depends(get_read_db)
+):
+    """Число продуктов по категориям и гистограмма цен (требует права на чтение продуктов)"""
+    return await read_facets(session)
+
+
+@router.get("/products/search/", response_model=List[ProductRead])
+async def search_products_view(
+    q: str = Query(..., min_length=1, max_length=200, description="Слова из названия, категории или описания"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user=Depends(require_permission("products", "read")),
+    session: AsyncSession = Depends(get_read_db)
+):
+    """Полнотекстовый поиск продуктов по релевантности (требует права на чтение продуктов)"""
+    return await search_products(session, q, limit)
 
 
 @router.get("/products/{product_id}/", response_model=ProductRead)
 async def get_product(
-    product_id: int,
+    product_id: uuid.UUID,
     current_user=Depends(require_permission("products", "read")),
     session: AsyncSession = Depends(get_db)
 ):
@@ -52,6 +99,7 @@ async def create_product(
     """Создать новый продукт (требует права на запись продуктов)"""
     product = Product(**product_data.model_dump())
     session.add(product)
+    await move_product_facet(session, None, (product.category, product.price))
     await session.commit()
     await session.refresh(product)
     
@@ -60,13 +108,14 @@ async def create_product(
 
 @router.put("/products/{product_id}/", response_model=ProductRead)
 async def update_product(
-    product_id: int,
+    product_id: uuid.UUID,
     product_data: ProductCreate,
     current_user=Depends(require_permission("products", "write")),
     session: AsyncSession = Depends(get_db)
 ):
     """Обновить продукт (требует права на запись продуктов)"""
-    product = await session.get(Product, product_id)
+    # Блокировка строки: параллельные правки не посчитают дельту фасетов от одного и того же старого значения
+    product = await get_for_update(session, Product, product_id)
     
     if not product:
         raise HTTPException(
@@ -74,10 +123,12 @@ async def update_product(
             detail="Product not found"
         )
     
+    old_facet = (product.category, product.price)
     # Обновляем поля
     for field, value in product_data.model_dump().items():
         setattr(product, field, value)
     
+    await move_product_facet(session, old_facet, (product.category, product.price))
     await session.commit()
     await session.refresh(product)
     
@@ -86,12 +137,12 @@ async def update_product(
 
 @router.delete("/products/{product_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
-    product_id: int,
+    product_id: uuid.UUID,
     current_user=Depends(require_permission("products", "delete")),
     session: AsyncSession = Depends(get_db)
 ):
     """Удалить продукт (требует права на удаление продуктов)"""
-    product = await session.get(Product, product_id)
+    product = await get_for_update(session, Product, product_id)
     
     if not product:
         raise HTTPException(
@@ -101,49 +152,44 @@ async def delete_product(
     
     # Жесткое удаление - удаляем продукт из БД
     await session.delete(product)
+    await move_product_facet(session, (product.category, product.price), None)
     await session.commit()
     
     return {"message": "Product deleted successfully"}
 
 
 # Управление заказами
-@router.get("/orders/", response_model=List[OrderRead])
+@router.get("/orders/", response_model=Page[OrderRead])
 async def get_orders(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    stream_all: bool = Query(False, alias="all", description="Выгрузить все заказы потоком (JSON-массив)"),
     current_user=Depends(require_permission("orders", "read")),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
-    """Получить список всех заказов (требует права на чтение заказов)"""
-    query = select(Order)
-    result = await session.execute(query)
-    orders = result.scalars().all()
-    
-    # Загружаем связанные продукты
-    for order in orders:
-        await session.refresh(order, ['product'])
-    
-    return list(orders)
+    """Получить страницу заказов или выгрузить все потоком (требует права на чтение заказов)"""
+    # Продукты загружаются тем же запросом (JOIN)
+    query = select(Order).options(joinedload(Order.product))
+    if stream_all or wants_ndjson(request):
+        return stream_collection(request, query.order_by(Order.id), OrderRead)
+    return await paginate(session, query, Order.id, page)
 
 
-@router.get("/orders/my/", response_model=List[OrderRead])
+@router.get("/orders/my/", response_model=Page[OrderRead])
 async def get_my_orders(
+    page: PageParams = Depends(page_params),
     current_user=Depends(get_user_strict),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
-    """Получить заказы текущего пользователя (доступно всем авторизованным пользователям)"""
-    query = select(Order).where(Order.user_id == current_user.id)
-    result = await session.execute(query)
-    orders = result.scalars().all()
-    
-    # Загружаем связанные продукты
-    for order in orders:
-        await session.refresh(order, ['product'])
-    
-    return list(orders)
+    """Получить страницу заказов текущего пользователя (доступно всем авторизованным пользователям)"""
+    # Продукты загружаются тем же запросом (JOIN)
+    query = select(Order).options(joinedload(Order.product)).where(Order.user_id == current_user.id)
+    return await paginate(session, query, Order.id, page)
 
 
 @router.get("/orders/{order_id}/", response_model=OrderRead)
 async def get_order(
-    order_id: int,
+    order_id: uuid.UUID,
     current_user=Depends(require_permission("orders", "read")),
     session: AsyncSession = Depends(get_db)
 ):
@@ -164,47 +210,32 @@ async def get_order(
 
 @router.post("/orders/", response_model=OrderRead, status_code=status.HTTP_201_CREATED)
 async def create_order(
-    order_data: OrderCreate,
+    order_data: OrderPlace,
     current_user=Depends(require_permission("orders", "write")),
     session: AsyncSession = Depends(get_db)
 ):
-    """Создать новый заказ (требует права на запись заказов)"""
-    # Проверяем, что продукт существует
-    product = await session.get(Product, order_data.product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    
-    # Проверяем, что пользователь существует
-    user = await session.get(User, order_data.user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    order = Order(**order_data.model_dump())
-    session.add(order)
-    await session.commit()
-    await session.refresh(order)
-    
-    # Загружаем связанный продукт
-    await session.refresh(order, ['product'])
-    
-    return order
+    """Создать новый заказ по текущей цене продукта (требует права на запись заказов)"""
+    # Один запрос: вставка с расчетом суммы в SQL, итоги продаж и продукт в ответе;
+    # несуществующие продукт и пользователь дают 404 без предварительных проверок
+    return await place_order(
+        session,
+        user_id=order_data.user_id or current_user.id,
+        product_id=order_data.product_id,
+        quantity=order_data.quantity,
+        order_status=order_data.status
+    )
 
 
 @router.put("/orders/{order_id}/", response_model=OrderRead)
 async def update_order(
-    order_id: int,
+    order_id: uuid.UUID,
     order_data: OrderCreate,
     current_user=Depends(require_permission("orders", "write")),
     session: AsyncSession = Depends(get_db)
 ):
     """Обновить заказ (требует права на запись заказов)"""
-    order = await session.get(Order, order_id)
+    # Блокировка строки: параллельные правки не применят одну и ту же дельту итогов дважды
+    order = await get_for_update(session, Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -212,10 +243,14 @@ async def update_order(
             detail="Order not found"
         )
     
+    old_snapshot = await order_snapshot(session, order)
     # Обновляем поля
     for field, value in order_data.model_dump().items():
         setattr(order, field, value)
+    if order.product_id != old_snapshot.product_id:
+        order.category = None
     
+    await move_order_rollup(session, old_snapshot, await order_snapshot(session, order))
     await session.commit()
     await session.refresh(order)
     
@@ -227,12 +262,12 @@ async def update_order(
 
 @router.delete("/orders/{order_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_order(
-    order_id: int,
+    order_id: uuid.UUID,
     current_user=Depends(require_permission("orders", "delete")),
     session: AsyncSession = Depends(get_db)
 ):
     """Удалить заказ (требует права на удаление заказов)"""
-    order = await session.get(Order, order_id)
+    order = await get_for_update(session, Order, order_id)
     
     if not order:
         raise HTTPException(
@@ -240,6 +275,7 @@ async def delete_order(
             detail="Order not found"
         )
     
+    await move_order_rollup(session, await order_snapshot(session, order), None)
     await session.delete(order)
     await session.commit()
     
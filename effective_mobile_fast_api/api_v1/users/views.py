@@ -1,12 +1,15 @@
+import uuid
+
 from fastapi import APIRouter, status, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, require_permission
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, invalidate_principal, require_permission
+from effective_mobile_fast_api.core.access_control import bump_policy_version
 from effective_mobile_fast_api.core.db import get_db
 from effective_mobile_fast_api.core.entities.users import UserUpdate, UserRead, UserPublic
 from effective_mobile_fast_api.core.models.tables import User, UserStatus
-from effective_mobile_fast_api.api_v1.auth.security import hash_password
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
 
 router = APIRouter(tags=["Users"])
 
@@ -40,13 +43,15 @@ async def update_current_user(
     update_data = user_update.model_dump(exclude_unset=True)
     
     if "password" in update_data:
-        update_data["password_hash"] = hash_password(update_data.pop("password"))
+        update_data["password_hash"] = await password_hasher.hash(update_data.pop("password"))
     
     for field, value in update_data.items():
         setattr(user, field, value)
     
+    await bump_policy_version(session)
     await session.commit()
     await session.refresh(user)
+    invalidate_principal(user.id)
     
     return UserRead.model_validate(user)
 
@@ -67,14 +72,16 @@ async def delete_current_user(
     
     # Мягкое удаление - меняем статус на deleted
     user.status = UserStatus.deleted
+    await bump_policy_version(session)
     await session.commit()
+    invalidate_principal(user.id)
     
     return {"message": "Account deleted successfully"}
 
 
 @router.get("/{user_id}/", response_model=UserPublic)
 async def get_user(
-        user_id: int,
+        user_id: uuid.UUID,
         current_user: UserPublic = Depends(require_permission("users", "read")),
         session: AsyncSession = Depends(get_db)
 ):
@@ -1,3 +1,4 @@
+import uuid
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Request, HTTPException, status, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -5,12 +6,13 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, require_admin
-from effective_mobile_fast_api.core.db import get_db
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_strict, invalidate_principal, require_admin
+from effective_mobile_fast_api.core.db import get_db, get_read_db
 from effective_mobile_fast_api.core.models.tables import User, Role, Permission, UserRole, RolePermission, UserStatus
 from effective_mobile_fast_api.core.entities.users import UserCreate
 from effective_mobile_fast_api.api_v1.auth.crud import create_user_db, get_user_by_email
 from effective_mobile_fast_api.api_v1.auth.security import hash_password
+from effective_mobile_fast_api.core.access_control import bump_policy_version, permission_matrix
 
 router = APIRouter(tags=["Admin Web"])
 templates = Jinja2Templates(directory="effective_mobile_fast_api/templates")
@@ -32,27 +34,25 @@ async def admin_panel(
 async def admin_users(
     request: Request,
     current_user=Depends(require_admin),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница управления пользователями"""
     try:
-        # Получаем всех пользователей с их ролями
+        # Получаем всех пользователей
         query = select(User)
         result = await session.execute(query)
         users = result.scalars().all()
         
-        # Загружаем роли для каждого пользователя и создаем словари
+        # Роли всех пользователей одним запросом
+        user_roles_query = select(UserRole.user_id, Role).join(Role, Role.id == UserRole.role_id)
+        user_roles_result = await session.execute(user_roles_query)
+        roles_by_user: dict[uuid.UUID, list[Role]] = {}
+        for user_id, role in user_roles_result.all():
+            roles_by_user.setdefault(user_id, []).append(role)
+        
+        # Создаем словари с данными пользователей
         users_data = []
         for user in users:
-            user_roles_query = (
-                select(Role)
-                .join(UserRole, Role.id == UserRole.role_id)
-                .where(UserRole.user_id == user.id)
-            )
-            user_roles_result = await session.execute(user_roles_query)
-            user_roles = list(user_roles_result.scalars().all())
-            
-            # Создаем словарь с данными пользователя
             user_data = {
                 "id": user.id,
                 "first_name": user.first_name,
@@ -60,7 +60,7 @@ async def admin_users(
                 "middle_name": user.middle_name,
                 "email": user.email,
                 "status": user.status,
-                "roles": user_roles
+                "roles": roles_by_user.get(user.id, [])
             }
             users_data.append(user_data)
         
@@ -122,7 +122,7 @@ async def admin_create_user(
 
 @router.post("/admin/users/{user_id}/delete")
 async def admin_delete_user(
-    user_id: str,
+    user_id: uuid.UUID,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -134,7 +134,9 @@ async def admin_delete_user(
         
         user.status = UserStatus.deleted
         session.add(user)
+        await bump_policy_version(session)
         await session.commit()
+        invalidate_principal(user_id)
         
         return RedirectResponse(url="/admin/users?success=Пользователь удален", status_code=302)
         
@@ -144,7 +146,7 @@ async def admin_delete_user(
 
 @router.post("/admin/users/{user_id}/restore")
 async def admin_restore_user(
-    user_id: str,
+    user_id: uuid.UUID,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -156,7 +158,9 @@ async def admin_restore_user(
         
         user.status = UserStatus.active
         session.add(user)
+        await bump_policy_version(session)
         await session.commit()
+        invalidate_principal(user_id)
         
         return RedirectResponse(url="/admin/users?success=Пользователь восстановлен", status_code=302)
         
@@ -168,39 +172,39 @@ async def admin_restore_user(
 async def admin_roles(
     request: Request,
     current_user=Depends(require_admin),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница управления ролями"""
     try:
-        # Получаем все роли с их разрешениями
+        # Получаем все роли
         query = select(Role)
         result = await session.execute(query)
         roles = result.scalars().all()
         
-        # Загружаем разрешения и количество пользователей для каждой роли
+        # Разрешения всех ролей одним запросом
+        role_permissions_query = (
+            select(RolePermission.role_id, Permission)
+            .join(Permission, Permission.id == RolePermission.permission_id)
+        )
+        role_permissions_result = await session.execute(role_permissions_query)
+        permissions_by_role: dict[uuid.UUID, list[Permission]] = {}
+        for role_id, permission in role_permissions_result.all():
+            permissions_by_role.setdefault(role_id, []).append(permission)
+        
+        # Количество пользователей по ролям одним запросом
+        user_counts_query = select(UserRole.role_id, func.count(UserRole.id)).group_by(UserRole.role_id)
+        user_counts_result = await session.execute(user_counts_query)
+        user_counts = dict(user_counts_result.all())
+        
+        # Создаем словари с данными ролей
         roles_data = []
         for role in roles:
-            # Разрешения роли
-            role_permissions_query = (
-                select(Permission)
-                .join(RolePermission, Permission.id == RolePermission.permission_id)
-                .where(RolePermission.role_id == role.id)
-            )
-            role_permissions_result = await session.execute(role_permissions_query)
-            role_permissions = list(role_permissions_result.scalars().all())
-            
-            # Количество пользователей с этой ролью
-            user_count_query = select(func.count(UserRole.id)).where(UserRole.role_id == role.id)
-            user_count_result = await session.execute(user_count_query)
-            user_count = user_count_result.scalar()
-            
-            # Создаем словарь с данными роли
             role_data = {
                 "id": role.id,
                 "name": role.name,
                 "description": role.description,
-                "permissions": role_permissions,
-                "user_count": user_count
+                "permissions": permissions_by_role.get(role.id, []),
+                "user_count": user_counts.get(role.id, 0)
             }
             roles_data.append(role_data)
         
@@ -223,20 +227,30 @@ async def admin_roles(
 async def admin_permissions(
     request: Request,
     current_user=Depends(require_admin),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница управления разрешениями"""
     try:
-        # Получаем все разрешения
-        query = select(Permission)
+        # Получаем все разрешения вместе с количеством ролей (GROUP BY)
+        query = (
+            select(Permission, func.count(RolePermission.id))
+            .outerjoin(RolePermission, RolePermission.permission_id == Permission.id)
+            .group_by(Permission.id)
+        )
         result = await session.execute(query)
-        permissions = result.scalars().all()
         
-        # Загружаем количество ролей для каждого разрешения
-        for permission in permissions:
-            role_count_query = select(func.count(RolePermission.id)).where(RolePermission.permission_id == permission.id)
-            role_count_result = await session.execute(role_count_query)
-            permission.role_count = role_count_result.scalar()
+        # Модель Permission не принимает лишние атрибуты, поэтому передаем в шаблон словари
+        permissions = [
+            {
+                "id": permission.id,
+                "name": permission.name,
+                "resource": permission.resource,
+                "action": permission.action,
+                "description": permission.description,
+                "role_count": role_count
+            }
+            for permission, role_count in result.all()
+        ]
         
         return templates.TemplateResponse("admin_permissions.html", {
             "request": request,
@@ -255,8 +269,8 @@ async def admin_permissions(
 
 @router.post("/admin/users/{user_id}/roles/assign")
 async def admin_assign_role(
-    user_id: str,
-    role_id: str = Form(...),
+    user_id: uuid.UUID,
+    role_id: uuid.UUID = Form(...),
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -274,7 +288,9 @@ async def admin_assign_role(
         # Назначаем роль
         user_role = UserRole(user_id=user_id, role_id=role_id)
         session.add(user_role)
+        await bump_policy_version(session)
         await session.commit()
+        permission_matrix.invalidate()
         
         return RedirectResponse(url=f"/admin/users/{user_id}/edit?success=Роль назначена", status_code=302)
         
@@ -284,8 +300,8 @@ async def admin_assign_role(
 
 @router.post("/admin/users/{user_id}/roles/remove")
 async def admin_remove_role(
-    user_id: str,
-    role_id: str = Form(...),
+    user_id: uuid.UUID,
+    role_id: uuid.UUID = Form(...),
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
 ):
@@ -301,7 +317,9 @@ async def admin_remove_role(
         
         if user_role:
             await session.delete(user_role)
+            await bump_policy_version(session)
             await session.commit()
+            permission_matrix.invalidate()
         
         return RedirectResponse(url=f"/admin/users/{user_id}/edit?success=Роль удалена", status_code=302)
         
@@ -311,7 +329,7 @@ async def admin_remove_role(
 
 @router.get("/admin/users/{user_id}/edit", response_class=HTMLResponse)
 async def admin_edit_user(
-    user_id: str,
+    user_id: uuid.UUID,
     request: Request,
     current_user=Depends(require_admin),
     session: AsyncSession = Depends(get_db)
@@ -365,7 +383,7 @@ async def admin_edit_user(
 
 @router.post("/admin/users/{user_id}/edit")
 async def admin_update_user(
-    user_id: str,
+    user_id: uuid.UUID,
     request: Request,
     first_name: str = Form(...),
     last_name: str = Form(...),
@@ -398,7 +416,9 @@ async def admin_update_user(
         user.email = email
         
         session.add(user)
+        await bump_policy_version(session)
         await session.commit()
+        invalidate_principal(user_id)
         
         return RedirectResponse(url="/admin/users?success=Пользователь обновлен", status_code=302)
         
@@ -1,30 +1,37 @@
+import math
+import uuid
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Request, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_soft, get_user_strict, require_permission
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_user_soft, get_user_strict, get_authz_soft, get_authz_context
+from effective_mobile_fast_api.api_v1.business.product_search import search_products
+from effective_mobile_fast_api.api_v1.business.order_placement import place_order
 from effective_mobile_fast_api.api_v1.web.admin_views import router as admin_router
-from effective_mobile_fast_api.core.db import get_db
+from effective_mobile_fast_api.core.db import get_db, get_read_db
 from effective_mobile_fast_api.core.models.tables import Product, Order
-from effective_mobile_fast_api.core.access_control import AccessControlService
+from effective_mobile_fast_api.core.access_control import AccessControlService, AuthzContext, build_authz_claim
 from effective_mobile_fast_api.api_v1.auth.crud import get_user_by_email, create_user_db
 from effective_mobile_fast_api.core.entities.users import UserCreate
-from effective_mobile_fast_api.api_v1.auth.security import verify_password, generate_and_set_tokens
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
+from effective_mobile_fast_api.api_v1.auth.revocation import request_tokens, revocation_list
+from effective_mobile_fast_api.api_v1.auth.security import generate_and_set_tokens
+from effective_mobile_fast_api.api_v1.auth.throttling import login_throttle
 from effective_mobile_fast_api.api_v1.auth.config import Production
 
 router = APIRouter(tags=["Web"])
 templates = Jinja2Templates(directory="effective_mobile_fast_api/templates")
 
+# Сколько результатов поиска показывать на странице продуктов
+SEARCH_RESULTS_ON_PAGE = 50
+
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, user=Depends(get_user_soft), session: AsyncSession = Depends(get_db)):
+async def index(request: Request, user=Depends(get_user_soft), authz: AuthzContext | None = Depends(get_authz_soft)):
     """Главная страница"""
-    user_roles = []
-    if user:
-        access_control = AccessControlService(session)
-        user_roles = await access_control.get_user_roles(user.id)
-    
     # Создаем словарь с информацией о пользователе для шаблона
     user_data = None
     if user:
@@ -35,7 +42,7 @@ async def index(request: Request, user=Depends(get_user_soft), session: AsyncSes
             "middle_name": user.middle_name,
             "email": user.email,
             "status": user.status,
-            "role": [role.name for role in user_roles]
+            "role": authz.roles
         }
     
     return templates.TemplateResponse("index.html", {
@@ -63,10 +70,18 @@ async def login_submit(
 ):
     """Обработка формы входа"""
     try:
+        # Отсекаем перебор до обращения к БД и bcrypt
+        retry_after = await login_throttle.acquire(username, request.client.host if request.client else None)
+        if retry_after:
+            return templates.TemplateResponse("login.html", {
+                "request": request,
+                "error": f"Слишком много попыток входа. Повторите через {math.ceil(retry_after)} с"
+            }, status_code=429)
+        
         # Ищем пользователя по email
         user = await get_user_by_email(session, username)
         
-        if not user or not verify_password(password, user.password_hash):
+        if not user or not await password_hasher.verify(password, user.password_hash):
             return templates.TemplateResponse("login.html", {
                 "request": request,
                 "error": "Неверный email или пароль"
@@ -79,8 +94,12 @@ async def login_submit(
                 "error": "Аккаунт был удален"
             })
         
+        await login_throttle.reset_account(username)
+        password_hasher.schedule_rehash(user.id, password, user.password_hash)
+        
         # Генерируем токены
-        generate_and_set_tokens(response, str(user.id), secure=Production)
+        authz = await build_authz_claim(session, str(user.id))
+        generate_and_set_tokens(response, str(user.id), secure=Production, authz=authz)
         
         # Используем тот же response объект для редиректа
         response.headers["location"] = "/"
@@ -199,8 +218,9 @@ async def register_submit(
 
 
 @router.post("/auth/logout")
-async def logout():
-    """Выход из системы"""
+async def logout(request: Request, session: AsyncSession = Depends(get_db)):
+    """Выход из системы с отзывом текущих токенов"""
+    await revocation_list.revoke_tokens(session, *request_tokens(request))
     response = RedirectResponse(url="/", status_code=302)
     response.delete_cookie(key="access_token", httponly=True, samesite="lax", secure=Production)
     response.delete_cookie(key="refresh_token", httponly=True, samesite="lax", secure=Production)
@@ -228,19 +248,22 @@ async def profile_page(
 @router.get("/business/products", response_class=HTMLResponse)
 async def products_page(
     request: Request,
+    q: Optional[str] = None,
     user=Depends(get_user_strict),
-    session: AsyncSession = Depends(get_db)
+    authz: AuthzContext = Depends(get_authz_context),
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница продуктов"""
     try:
-        # Проверяем права доступа
-        access_control = AccessControlService(session)
-        
-        can_read = await access_control.has_permission(user.id, "products", "read")
-        can_create = await access_control.has_permission(user.id, "products", "write")
-        can_edit = await access_control.has_permission(user.id, "products", "write")
-        can_delete = await access_control.has_permission(user.id, "products", "delete")
-        can_order = await access_control.has_permission(user.id, "orders", "write")
+        # Проверяем права доступа (одним пакетом из контекста запроса)
+        checks = authz.has_permissions([
+            ("products", "read"), ("products", "write"), ("products", "delete"), ("orders", "write")
+        ])
+        can_read = checks[("products", "read")]
+        can_create = checks[("products", "write")]
+        can_edit = checks[("products", "write")]
+        can_delete = checks[("products", "delete")]
+        can_order = checks[("orders", "write")]
         
         if not can_read:
             return templates.TemplateResponse("products.html", {
@@ -254,16 +277,20 @@ async def products_page(
                 "error": "У вас нет прав для просмотра продуктов"
             })
         
-        # Получаем продукты
-        from sqlalchemy import select
-        query = select(Product)
-        result = await session.execute(query)
-        products = result.scalars().all()
+        # Получаем продукты: по поисковому запросу — самые релевантные, иначе весь каталог
+        if q and q.strip():
+            products = await search_products(session, q, SEARCH_RESULTS_ON_PAGE)
+        else:
+            from sqlalchemy import select
+            query = select(Product)
+            result = await session.execute(query)
+            products = result.scalars().all()
         
         return templates.TemplateResponse("products.html", {
             "request": request,
             "user": user,
             "products": products,
+            "q": q or "",
             "can_create": can_create,
             "can_edit": can_edit,
             "can_delete": can_delete,
@@ -281,13 +308,12 @@ async def products_page(
 @router.get("/business/products/{product_id}/edit", response_class=HTMLResponse)
 async def edit_product_stub(
     request: Request,
-    product_id: str,
+    product_id: uuid.UUID,
     user=Depends(get_user_strict),
-    session: AsyncSession = Depends(get_db)
+    authz: AuthzContext = Depends(get_authz_context)
 ):
     """Заглушка для редактирования продукта - проверка прав доступа"""
-    access_control = AccessControlService(session)
-    can_edit = await access_control.has_permission(user.id, "products", "write")
+    can_edit = authz.can("products", "write")
     
     if can_edit:
         return templates.TemplateResponse("stub.html", {
@@ -310,15 +336,15 @@ async def edit_product_stub(
 @router.get("/business/orders/create", response_class=HTMLResponse)
 async def create_order_page(
     request: Request,
-    product_id: str = None,
+    product_id: Optional[uuid.UUID] = None,
     user=Depends(get_user_strict),
+    authz: AuthzContext = Depends(get_authz_context),
     session: AsyncSession = Depends(get_db)
 ):
     """Страница создания заказа"""
     try:
         # Проверяем права на создание заказов
-        access_control = AccessControlService(session)
-        can_order = await access_control.has_permission(user.id, "orders", "write")
+        can_order = authz.can("orders", "write")
         
         if not can_order:
             return templates.TemplateResponse("create_order.html", {
@@ -362,16 +388,16 @@ async def create_order_page(
 @router.post("/business/orders/create")
 async def create_order_submit(
     request: Request,
-    product_id: str = Form(...),
+    product_id: uuid.UUID = Form(...),
     quantity: int = Form(...),
     user=Depends(get_user_strict),
+    authz: AuthzContext = Depends(get_authz_context),
     session: AsyncSession = Depends(get_db)
 ):
     """Создание заказа"""
     try:
         # Проверяем права на создание заказов
-        access_control = AccessControlService(session)
-        can_order = await access_control.has_permission(user.id, "orders", "write")
+        can_order = authz.can("orders", "write")
         
         if not can_order:
             return templates.TemplateResponse("create_order.html", {
@@ -380,27 +406,23 @@ async def create_order_submit(
                 "error": "У вас нет прав для создания заказов"
             })
         
-        # Получаем продукт
-        product = await session.get(Product, product_id)
-        if not product:
+        # Проверяем здесь, а не в Form(ge=1): браузер должен получить страницу, а не JSON с 422
+        if quantity < 1:
             return templates.TemplateResponse("create_order.html", {
                 "request": request,
                 "user": user,
-                "error": "Продукт не найден"
+                "error": "Количество должно быть не меньше 1"
             })
         
-        # Создаем заказ
-        total_amount = product.price * quantity
-        order = Order(
-            user_id=user.id,
-            product_id=product_id,
-            quantity=quantity,
-            total_amount=total_amount,
-            status="pending"
-        )
-        
-        session.add(order)
-        await session.commit()
+        # Создаем заказ тем же путем, что и API: цена и сумма берутся из БД одним запросом
+        try:
+            await place_order(session, user_id=user.id, product_id=product_id, quantity=quantity)
+        except HTTPException as exc:
+            return templates.TemplateResponse("create_order.html", {
+                "request": request,
+                "user": user,
+                "error": exc.detail
+            })
         
         # Перенаправляем на страницу заказов
         return RedirectResponse(url="/business/orders/my", status_code=303)
@@ -417,13 +439,13 @@ async def create_order_submit(
 async def orders_page(
     request: Request,
     user=Depends(get_user_strict),
-    session: AsyncSession = Depends(get_db)
+    authz: AuthzContext = Depends(get_authz_context),
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница заказов"""
     try:
         # Проверяем права доступа
-        access_control = AccessControlService(session)
-        can_read = await access_control.has_permission(user.id, "orders", "read")
+        can_read = authz.can("orders", "read")
         
         if not can_read:
             return templates.TemplateResponse("orders.html", {
@@ -434,9 +456,8 @@ async def orders_page(
         
         # Получаем заказы в зависимости от роли
         from sqlalchemy import select
-        access_control = AccessControlService(session)
-        is_admin = await access_control.is_admin(user.id)
-        is_manager = await access_control.has_role(user.id, "manager")
+        is_admin = authz.is_admin
+        is_manager = authz.has_role("manager")
         
         if is_admin or is_manager:
             # Админы и менеджеры видят все заказы
@@ -472,7 +493,7 @@ async def orders_page(
 async def my_orders_page(
     request: Request,
     user=Depends(get_user_strict),
-    session: AsyncSession = Depends(get_db)
+    session: AsyncSession = Depends(get_read_db)
 ):
     """Страница моих заказов"""
     try:
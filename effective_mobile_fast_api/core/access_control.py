@@ -1,8 +1,272 @@
-from typing import List, Optional
+import asyncio
+import base64
+import hashlib
+import time
+from typing import Iterable, List, NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import bindparam, select
 
-from effective_mobile_fast_api.core.models.tables import User, Role, Permission, UserRole, RolePermission
+from effective_mobile_fast_api.core.cache import LRUCache
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.db import dialect_insert
+from effective_mobile_fast_api.core.models.base import as_uuid
+from effective_mobile_fast_api.core.models.tables import User, Role, Permission, PolicyVersion, UserRole, RolePermission
+
+
+# Запросы проверки прав собираются один раз при импорте (компиляция — один раз на процесс)
+ROLE_NAMES_STATEMENT = select(Role.id, Role.name)
+ROLE_GRANTS_STATEMENT = (
+    select(RolePermission.role_id, Permission.resource, Permission.action)
+    .join(Permission, Permission.id == RolePermission.permission_id)
+)
+PERMISSION_INDEX_STATEMENT = (
+    select(Permission.resource, Permission.action)
+    .distinct()
+    .order_by(Permission.resource, Permission.action)
+)
+POLICY_VERSION_ROW = 1
+POLICY_VERSION_STATEMENT = select(PolicyVersion.version).where(PolicyVersion.id == POLICY_VERSION_ROW)
+USER_ROLE_IDS_STATEMENT = select(UserRole.role_id).where(UserRole.user_id == bindparam("user_id"))
+USER_PERMISSIONS_STATEMENT = (
+    select(Permission)
+    .join(RolePermission, Permission.id == RolePermission.permission_id)
+    .join(Role, RolePermission.role_id == Role.id)
+    .join(UserRole, Role.id == UserRole.role_id)
+    .where(UserRole.user_id == bindparam("user_id"))
+)
+USER_ROLES_STATEMENT = (
+    select(Role)
+    .join(UserRole, Role.id == UserRole.role_id)
+    .where(UserRole.user_id == bindparam("user_id"))
+)
+
+
+class UserGrants(NamedTuple):
+    """Скомпилированные права пользователя"""
+    role_ids: frozenset[str]
+    roles: frozenset[str]
+    permissions: frozenset[tuple[str, str]]
+
+
+class PermissionMatrix:
+    """Скомпилированная в памяти матрица прав: роль → разрешения, пользователь → роли.
+
+    Версия политики хранится в БД (таблица policyversions) и увеличивается через
+    bump_policy_version() в той же транзакции, что и любое изменение ролей, разрешений
+    или назначений ролей пользователям (а также данных и статуса пользователей — по ней
+    устаревает кэш текущего пользователя). Процесс перечитывает ее не реже раза в
+    check_interval секунд и перестраивает матрицу, если она изменилась; invalidate()
+    после собственного commit заставляет перечитать версию сразу.
+
+    Матрица также задает стабильный индекс разрешений (сортировка по resource, action),
+    по которому права пользователя упаковываются в битовую маску для access-токена.
+    """
+
+    def __init__(self, max_users: int, ttl: float, check_interval: float):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        # Версия политики из БД, по которой собрана матрица (None — еще не собрана)
+        self.version: Optional[int] = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._compiled_at = 0.0
+        # Локальный счетчик сбросов: защищает кэш пользователей от записи устаревших прав
+        self._generation = 0
+        self._role_names: dict[str, str] = {}
+        self._role_permissions: dict[str, frozenset[tuple[str, str]]] = {}
+        self._permission_bits: list[tuple[str, str]] = []
+        self._digest = ""
+        self._users = LRUCache(max_size=max_users, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Перечитать версию политики при следующем обращении (после собственного изменения RBAC)"""
+        self._stale = True
+        self._generation += 1
+        self._users.clear()
+
+    def _is_fresh(self) -> bool:
+        return not self._stale and time.monotonic() - self._checked_at < self.check_interval
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """Сверить версию политики с БД (не чаще check_interval) и перестроить матрицу, если она изменилась"""
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if self._is_fresh():
+                return
+
+            # invalidate() во время проверки снова пометит матрицу устаревшей
+            self._stale = False
+            checked_at = time.monotonic()
+            version = (await session.execute(POLICY_VERSION_STATEMENT)).scalar() or 0
+            # По TTL матрица перестраивается и без смены версии — на случай правок в обход приложения
+            if version != self.version or checked_at - self._compiled_at >= self.ttl:
+                await self._compile(session)
+                self.version = version
+                self._compiled_at = checked_at
+                self._generation += 1
+                # Матрица ролей изменилась — закэшированные объединения пользователей устарели
+                self._users.clear()
+            self._checked_at = checked_at
+
+    async def _compile(self, session: AsyncSession) -> None:
+        """Загрузить отображение роль → набор (resource, action)"""
+        roles_result = await session.execute(ROLE_NAMES_STATEMENT)
+        # id ролей храним строками: в таком виде они попадают в claim токена
+        role_names = {str(role_id): name for role_id, name in roles_result.all()}
+
+        grants_result = await session.execute(ROLE_GRANTS_STATEMENT)
+        role_permissions: dict[str, set[tuple[str, str]]] = {role_id: set() for role_id in role_names}
+        for role_id, resource, action in grants_result.all():
+            role_permissions.setdefault(str(role_id), set()).add((resource, action))
+
+        permissions_result = await session.execute(PERMISSION_INDEX_STATEMENT)
+        permission_bits = [(resource, action) for resource, action in permissions_result.all()]
+
+        self._role_names = role_names
+        self._role_permissions = {
+            role_id: frozenset(pairs) for role_id, pairs in role_permissions.items()
+        }
+        self._permission_bits = permission_bits
+        self._digest = self._make_digest()
+
+    async def get_user_grants(self, session: AsyncSession, user_id: str) -> UserGrants:
+        """Получить роли и разрешения пользователя (в том числе пустые — отрицательный результат тоже кэшируется)"""
+        await self.refresh(session)
+
+        cache_key = str(user_id)
+        grants = self._users.get(cache_key)
+        if grants is not None:
+            return grants
+
+        generation = self._generation
+        result = await session.execute(USER_ROLE_IDS_STATEMENT, {"user_id": as_uuid(user_id)})
+        role_ids = frozenset(str(role_id) for role_id in result.scalars().all())
+
+        permissions: set[tuple[str, str]] = set()
+        for role_id in role_ids:
+            permissions |= self._role_permissions.get(role_id, frozenset())
+
+        grants = UserGrants(
+            role_ids=role_ids,
+            roles=frozenset(self._role_names[role_id] for role_id in role_ids if role_id in self._role_names),
+            permissions=frozenset(permissions),
+        )
+        # Не кэшируем результат, если матрицу сбросили во время запроса
+        if generation == self._generation:
+            self._users.set(cache_key, grants)
+        return grants
+
+    def _make_digest(self) -> str:
+        """Отпечаток индекса разрешений и матрицы ролей — ловит правки ролей в обход bump_policy_version"""
+        digest = hashlib.sha256()
+        for resource, action in self._permission_bits:
+            digest.update(f"{resource}:{action};".encode())
+        for role_id in sorted(self._role_permissions):
+            pairs = ",".join(f"{resource}:{action}" for resource, action in sorted(self._role_permissions[role_id]))
+            digest.update(f"{role_id}={pairs};".encode())
+        return digest.hexdigest()[:12]
+
+    @property
+    def policy_version(self) -> str:
+        """Версия для claim токена: общая для всех процессов и не сбрасывается при перезапуске"""
+        return f"{self.version}.{self._digest}"
+
+    def encode_claim(self, grants: UserGrants) -> dict:
+        """Упаковать права пользователя в компактный claim: битовая маска, роли и версия политики"""
+        bits = bytearray((len(self._permission_bits) + 7) // 8)
+        for position, pair in enumerate(self._permission_bits):
+            if pair in grants.permissions:
+                bits[position // 8] |= 1 << (position % 8)
+        return {
+            "v": self.policy_version,
+            "p": base64.urlsafe_b64encode(bytes(bits)).decode().rstrip("="),
+            "r": sorted(grants.role_ids),
+        }
+
+    def decode_claim(self, claim: Optional[dict]) -> Optional[UserGrants]:
+        """Восстановить права из claim; None, если claim отсутствует, версия устарела или не сверена с БД"""
+        if not claim or not self._is_fresh() or claim.get("v") != self.policy_version:
+            return None
+        try:
+            encoded = claim["p"]
+            bits = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            role_ids = frozenset(claim["r"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        permissions = frozenset(
+            pair for position, pair in enumerate(self._permission_bits)
+            if position // 8 < len(bits) and bits[position // 8] & (1 << (position % 8))
+        )
+        return UserGrants(
+            role_ids=role_ids,
+            roles=frozenset(self._role_names[role_id] for role_id in role_ids if role_id in self._role_names),
+            permissions=permissions,
+        )
+
+    def stats(self) -> dict:
+        """Версия матрицы и статистика кэша пользователей"""
+        return {
+            "version": self.version,
+            "policy_version": self.policy_version,
+            "roles": len(self._role_names),
+            "users": self._users.stats(),
+        }
+
+
+async def bump_policy_version(session: AsyncSession) -> None:
+    """Увеличить версию политики в текущей транзакции; вызывать перед commit любого изменения RBAC"""
+    statement = dialect_insert(session)(PolicyVersion).values(id=POLICY_VERSION_ROW, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PolicyVersion.id],
+        set_={"version": PolicyVersion.version + 1}
+    )
+    await session.execute(statement)
+
+
+permission_matrix = PermissionMatrix(
+    max_users=settings.rbac_cache_max_users,
+    ttl=settings.rbac_cache_ttl_seconds,
+    check_interval=settings.rbac_policy_check_seconds
+)
+
+
+class AuthzContext:
+    """Права текущего пользователя, загруженные один раз на запрос"""
+
+    def __init__(self, grants: UserGrants):
+        self.grants = grants
+
+    @property
+    def roles(self) -> list[str]:
+        return sorted(self.grants.roles)
+
+    @property
+    def is_admin(self) -> bool:
+        return "admin" in self.grants.roles
+
+    def can(self, resource: str, action: str) -> bool:
+        """Проверить разрешение на действие с ресурсом"""
+        return (resource, action) in self.grants.permissions
+
+    def has_role(self, role_name: str) -> bool:
+        """Проверить наличие роли"""
+        return role_name in self.grants.roles
+
+    def has_permissions(self, checks: Iterable[tuple[str, str]]) -> dict[tuple[str, str], bool]:
+        """Проверить несколько разрешений за раз: (resource, action) → bool"""
+        return {(resource, action): self.can(resource, action) for resource, action in checks}
+
+
+async def build_authz_claim(session: AsyncSession, user_id: str) -> Optional[dict]:
+    """Claim с правами для access-токена (только если включен режим JWT_EMBED_PERMISSIONS)"""
+    if not settings.jwt_embed_permissions:
+        return None
+    grants = await permission_matrix.get_user_grants(session, user_id)
+    return permission_matrix.encode_claim(grants)
 
 
 class AccessControlService:
@@ -13,62 +277,23 @@ class AccessControlService:
     
     async def get_user_permissions(self, user_id: str) -> List[Permission]:
         """Получить все разрешения пользователя через его роли"""
-        query = (
-            select(Permission)
-            .join(RolePermission, Permission.id == RolePermission.permission_id)
-            .join(Role, RolePermission.role_id == Role.id)
-            .join(UserRole, Role.id == UserRole.role_id)
-            .where(UserRole.user_id == user_id)
-        )
-        
-        result = await self.session.execute(query)
+        result = await self.session.execute(USER_PERMISSIONS_STATEMENT, {"user_id": as_uuid(user_id)})
         return list(result.scalars().all())
     
     async def get_user_roles(self, user_id: str) -> List[Role]:
         """Получить все роли пользователя"""
-        query = (
-            select(Role)
-            .join(UserRole, Role.id == UserRole.role_id)
-            .where(UserRole.user_id == user_id)
-        )
-        
-        result = await self.session.execute(query)
+        result = await self.session.execute(USER_ROLES_STATEMENT, {"user_id": as_uuid(user_id)})
         return list(result.scalars().all())
     
     async def has_permission(self, user_id: str, resource: str, action: str) -> bool:
         """Проверить, есть ли у пользователя разрешение на выполнение действия с ресурсом"""
-        query = (
-            select(Permission)
-            .join(RolePermission, Permission.id == RolePermission.permission_id)
-            .join(Role, RolePermission.role_id == Role.id)
-            .join(UserRole, Role.id == UserRole.role_id)
-            .where(
-                and_(
-                    UserRole.user_id == user_id,
-                    Permission.resource == resource,
-                    Permission.action == action
-                )
-            )
-        )
-        
-        result = await self.session.execute(query)
-        return result.scalar_one_or_none() is not None
+        grants = await permission_matrix.get_user_grants(self.session, user_id)
+        return (resource, action) in grants.permissions
     
     async def has_role(self, user_id: str, role_name: str) -> bool:
         """Проверить, есть ли у пользователя определенная роль"""
-        query = (
-            select(Role)
-            .join(UserRole, Role.id == UserRole.role_id)
-            .where(
-                and_(
-                    UserRole.user_id == user_id,
-                    Role.name == role_name
-                )
-            )
-        )
-        
-        result = await self.session.execute(query)
-        return result.scalar_one_or_none() is not None
+        grants = await permission_matrix.get_user_grants(self.session, user_id)
+        return role_name in grants.roles
     
     async def is_admin(self, user_id: str) -> bool:
         """Проверить, является ли пользователь администратором"""
@@ -10,6 +10,66 @@ class Settings(BaseSettings):
         default="postgresql+asyncpg://youruser:yourpassword@db:5432/main_db",
         validation_alias="DB_URL"
     )
+    # Реплики для чтения через запятую; пусто — все запросы идут в основную БД
+    db_replica_urls: str = ""
+    # Выбор реплики: "round_robin" или "least_connections"
+    db_replica_strategy: str = "round_robin"
+    # Сколько секунд после записи запросы клиента читают из основной БД (read-your-writes)
+    db_stick_to_primary_seconds: int = 5
+    # Пул соединений (значения по умолчанию совпадают с SQLAlchemy)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle: int = -1
+    db_pool_timeout: float = 30.0
+    # Кэш подготовленных выражений asyncpg на соединение (0 — отключить, нужно за PgBouncer в режиме transaction)
+    db_prepared_statement_cache_size: int = 100
+
+    # Время жизни токенов
+    access_token_expire_minutes: int = 1
+    refresh_token_expire_days: int = 7
+    # Окно, в течение которого параллельные запросы с одним refresh-токеном получают одну новую пару
+    token_refresh_coalesce_seconds: float = 10.0
+
+    # Ограничение попыток входа (скользящее окно + экспоненциальная блокировка)
+    login_attempts_per_account: int = 5
+    login_attempts_per_ip: int = 50
+    login_throttle_window_seconds: float = 300.0
+    login_backoff_base_seconds: float = 30.0
+    login_backoff_max_seconds: float = 900.0
+    login_throttle_max_keys: int = 100000
+
+    # Отзыв токенов: Bloom-фильтр перед таблицей отозванных jti
+    token_revocation_capacity: int = 100000
+    token_revocation_fp_rate: float = 0.001
+    token_revocation_rebuild_seconds: float = 60.0
+
+    # Кэш текущего пользователя (get_user_soft)
+    principal_cache_max_size: int = 10000
+    principal_cache_ttl_seconds: float = 30.0
+
+    # Кэш матрицы прав доступа (RBAC)
+    rbac_cache_max_users: int = 10000
+    rbac_cache_ttl_seconds: float = 60.0
+    # Как часто процесс сверяет версию политики с БД (изменения RBAC в других процессах)
+    rbac_policy_check_seconds: float = 5.0
+    # Встраивать битовую маску прав в access-токен, чтобы проверять права без БД
+    jwt_embed_permissions: bool = False
+    # Кэш проверенных JWT (пропуск проверки подписи для повторных запросов)
+    jwt_cache_max_size: int = 10000
+
+    # Пул для bcrypt: "thread" или "process"
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_concurrency: int = 4
+    # Схема хеширования: "bcrypt" или "argon2" (нужен пакет argon2-cffi)
+    password_hash_scheme: str = "bcrypt"
+    # Стоимость хеширования (bcrypt rounds / argon2 time_cost), общая для всех процессов;
+    # подбирается один раз скриптом calibrate_password_hash, ниже значения библиотеки не опускается (0 — по умолчанию)
+    password_hash_rounds: int = 0
+    argon2_memory_cost_kib: int = 65536
+
+    # Ширина интервала гистограммы цен в фасетах каталога (после изменения агрегат пересчитывается при старте)
+    product_facet_price_bucket_width: float = 1000.0
 
 
 settings = Settings()
\ No newline at end of file
@@ -1,10 +1,11 @@
 from typing import TypeVar, Type, Dict, Any, Optional
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import SQLModel
 
+from effective_mobile_fast_api.core.entities.pagination import Page, PageParams, decode_cursor, encode_cursor
 from effective_mobile_fast_api.core.models import db_helper  # ваш DataBaseHelper
 
 
@@ -13,15 +14,69 @@ async def get_db(session: AsyncSession = Depends(db_helper.session_dependency)):
     yield session
 
 
+# Сессия для тяжелых списков: читает с реплики, если реплики настроены
+async def get_read_db(session: AsyncSession = Depends(db_helper.read_session_dependency)):
+    yield session
+
+
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
 
+def dialect_insert(session: AsyncSession):
+    """insert() с поддержкой ON CONFLICT для диалекта сессии (PostgreSQL или SQLite при разработке)"""
+    if session.bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+# Реестр запросов get_one_by_fields: (модель, поля) → запрос с параметрами
+_fields_statements: Dict[tuple, Any] = {}
+
+
+def _get_fields_statement(model: Type[ModelType], fields: tuple[str, ...]):
+    key = (model, fields)
+    statement = _fields_statements.get(key)
+    if statement is None:
+        conditions = [getattr(model, field) == bindparam(f"filter_{field}") for field in fields]
+        statement = select(model).where(*conditions)
+        _fields_statements[key] = statement
+    return statement
+
+
 async def get_one_by_fields(
         session: AsyncSession,
         model: Type[ModelType],
         filters: Dict[str, Any]
 ) -> Optional[ModelType]:
-    conditions = [getattr(model, key) == value for key, value in filters.items()]
-    query = select(model).where(*conditions)
-    result = await session.execute(query)
+    fields = tuple(sorted(filters))
+    query = _get_fields_statement(model, fields)
+    result = await session.execute(query, {f"filter_{field}": filters[field] for field in fields})
+    return result.scalars().first()
+
+
+async def get_for_update(session: AsyncSession, model: Type[ModelType], ident: Any) -> Optional[ModelType]:
+    """Строка по первичному ключу под блокировкой SELECT ... FOR UPDATE (до конца транзакции)"""
+    result = await session.execute(
+        select(model)
+        .where(model.id == ident)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
     return result.scalars().first()
+
+
+async def paginate(session: AsyncSession, query, key, params: PageParams) -> Page:
+    """Keyset-пагинация по индексированному ключу: WHERE key > курсор ORDER BY key LIMIT n (без OFFSET)"""
+    if params.after is not None:
+        query = query.where(key > decode_cursor(params.after, key.type.python_type))
+    query = query.order_by(key).limit(params.limit + 1)
+    result = await session.execute(query)
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if len(items) > params.limit:
+        items = items[:params.limit]
+        next_cursor = encode_cursor(getattr(items[-1], key.key))
+    return Page(items=items, next_cursor=next_cursor)
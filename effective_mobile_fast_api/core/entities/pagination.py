@@ -0,0 +1,46 @@
+import base64
+import binascii
+from typing import Any, Callable, Generic, List, Optional, TypeVar
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+ItemType = TypeVar("ItemType")
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+class Page(BaseModel, Generic[ItemType]):
+    """Страница списка: элементы и курсор следующей страницы (None — страница последняя)"""
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
+
+
+class PageParams(BaseModel):
+    limit: int
+    after: Optional[str] = None
+
+
+def page_params(
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        after: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы")
+) -> PageParams:
+    """Параметры пагинации из query-строки"""
+    return PageParams(limit=limit, after=after)
+
+
+def encode_cursor(key: str) -> str:
+    """Непрозрачный курсор из значения ключа сортировки"""
+    return base64.urlsafe_b64encode(str(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, convert: Callable[[str], Any] = str) -> Any:
+    """Значение ключа сортировки из курсора, приведенное к типу ключа"""
+    try:
+        return convert(base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
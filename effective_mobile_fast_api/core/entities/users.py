@@ -1,6 +1,7 @@
 from enum import Enum
 from typing import Optional, List
 import re
+import uuid
 
 from pydantic import BaseModel, Field, EmailStr, field_validator
 from pydantic import ConfigDict
@@ -74,13 +75,13 @@ class UserUpdate(BaseModel):
 
 
 class UserRead(UserBase):
-    id: str
+    id: uuid.UUID
     status: UserStatus
     model_config = ConfigDict(from_attributes=True)
 
 
 class UserPublic(BaseModel):
-    id: str
+    id: uuid.UUID
     first_name: str
     last_name: str
     middle_name: Optional[str]
@@ -100,7 +101,7 @@ class RoleCreate(RoleBase):
 
 
 class RoleRead(RoleBase):
-    id: str
+    id: uuid.UUID
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -116,32 +117,32 @@ class PermissionCreate(PermissionBase):
 
 
 class PermissionRead(PermissionBase):
-    id: str
+    id: uuid.UUID
     model_config = ConfigDict(from_attributes=True)
 
 
 class UserRoleCreate(BaseModel):
-    user_id: str
-    role_id: str
+    user_id: uuid.UUID
+    role_id: uuid.UUID
 
 
 class UserRoleRead(BaseModel):
-    id: str
-    user_id: str
-    role_id: str
+    id: uuid.UUID
+    user_id: uuid.UUID
+    role_id: uuid.UUID
     role: RoleRead
     model_config = ConfigDict(from_attributes=True)
 
 
 class RolePermissionCreate(BaseModel):
-    role_id: str
-    permission_id: str
+    role_id: uuid.UUID
+    permission_id: uuid.UUID
 
 
 class RolePermissionRead(BaseModel):
-    id: str
-    role_id: str
-    permission_id: str
+    id: uuid.UUID
+    role_id: uuid.UUID
+    permission_id: uuid.UUID
     permission: PermissionRead
     model_config = ConfigDict(from_attributes=True)
 
@@ -159,13 +160,78 @@ class ProductCreate(ProductBase):
 
 
 class ProductRead(ProductBase):
-    id: str
+    id: uuid.UUID
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductImportRow(ProductCreate):
+    # id необязателен: строка с существующим id обновляет продукт, без id — создает новый
+    id: Optional[uuid.UUID] = None
+
+    @field_validator('id', 'description', mode='before')
+    @classmethod
+    def empty_to_none(cls, v):
+        # Пустая ячейка CSV означает отсутствие значения
+        if isinstance(v, str) and not v.strip():
+            return None
+        return v
+
+
+class ProductImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ProductImportSummary(BaseModel):
+    format: str
+    rows_total: int
+    imported: int
+    failed: int
+    errors: List[ProductImportError]
+    errors_truncated: bool
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    # Цены в диапазоне [min_price, max_price)
+    min_price: float
+    max_price: float
+    count: int
+
+
+class ProductFacets(BaseModel):
+    total: int
+    bucket_width: float
+    categories: List[CategoryFacet]
+    price_histogram: List[PriceBucket]
+
+
+class SalesRollupRead(BaseModel):
+    key: str
+    # Название продукта или email пользователя для ключей-идентификаторов
+    label: Optional[str] = None
+    order_count: int
+    quantity: int
+    revenue: float
+
+
+class SalesStats(BaseModel):
+    total: SalesRollupRead
+    by_status: List[SalesRollupRead]
+    top_products: List[SalesRollupRead]
+    top_categories: List[SalesRollupRead]
+    top_users: List[SalesRollupRead]
+
+
 class OrderBase(BaseModel):
-    user_id: str
-    product_id: str
+    user_id: uuid.UUID
+    product_id: uuid.UUID
     quantity: int = Field(..., ge=1)
     total_amount: float = Field(..., ge=0)
     status: str = Field(default="pending", max_length=20)
@@ -175,7 +241,16 @@ class OrderCreate(OrderBase):
     pass
 
 
+class OrderPlace(BaseModel):
+    """Оформление заказа: сумма считается по текущей цене продукта, total_amount от клиента не принимается"""
+    product_id: uuid.UUID
+    quantity: int = Field(..., ge=1)
+    # По умолчанию — текущий пользователь
+    user_id: Optional[uuid.UUID] = None
+    status: str = Field(default="pending", max_length=20)
+
+
 class OrderRead(OrderBase):
-    id: str
+    id: uuid.UUID
     product: ProductRead
     model_config = ConfigDict(from_attributes=True)
@@ -6,12 +6,13 @@ __all__ = (
     "Permission",
     "UserRole",
     "RolePermission",
+    "RevokedToken",
     "Product",
     "Order",
 )
 
 from .db_helper import db_helper, DataBaseHelper
 from .tables import (
-    User, Role, Permission, UserRole, RolePermission,
+    User, Role, Permission, UserRole, RolePermission, RevokedToken,
     Product, Order
 )
@@ -1,7 +1,29 @@
+import os
+import time
+import uuid
+
 from sqlalchemy.ext.declarative import declared_attr
 from sqlmodel import SQLModel
 
 
+def uuid7() -> uuid.UUID:
+    """UUID версии 7 (RFC 9562): 48 бит времени в мс + случайные биты.
+
+    Ключи растут со временем, поэтому новые строки попадают в конец B-дерева
+    первичного ключа, а не в случайные страницы, как с uuid4.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # версия 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # вариант RFC 4122
+    return uuid.UUID(int=value)
+
+
+def as_uuid(value: uuid.UUID | str) -> uuid.UUID:
+    """Привести идентификатор (например, sub из JWT) к UUID; ValueError для некорректной строки"""
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
 class BaseModel(SQLModel):
     @declared_attr
     def __tablename__(cls) -> str:
@@ -1,23 +1,197 @@
+import itertools
+import time
 from asyncio import current_task
+from contextlib import asynccontextmanager
 
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from effective_mobile_fast_api.core.config import settings
 
 
+class PoolTelemetry:
+    """Счетчики пула соединений: ожидание выдачи соединения и стоимость pre-ping"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pings = 0
+        self.ping_failures = 0
+        self.ping_seconds_total = 0.0
+        self.max_checked_out = 0
+
+    def stats(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+            "max_checked_out": self.max_checked_out,
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+            "avg_ping_ms": round(self.ping_seconds_total / self.pings * 1000, 3) if self.pings else 0.0,
+        }
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetry = PoolTelemetry()
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.telemetry.timeouts += 1
+            raise
+        waited = time.perf_counter() - started_at
+        telemetry = self.telemetry
+        telemetry.acquired += 1
+        telemetry.wait_seconds_total += waited
+        telemetry.wait_seconds_max = max(telemetry.wait_seconds_max, waited)
+        telemetry.max_checked_out = max(telemetry.max_checked_out, self.checkedout())
+        return record
+
+    def recreate(self):
+        # Счетчики переживают пересоздание пула (engine.dispose)
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+# Cookie, по которой клиент после записи читает из основной БД
+STICK_TO_PRIMARY_COOKIE = "db_primary"
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+
+
 class DataBaseHelper:
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(
-            url=url,
+    def __init__(
+            self,
+            url: str,
+            echo: bool = False,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+            pool_recycle: int = -1,
+            pool_timeout: float = 30.0,
+            prepared_statement_cache_size: int = 100,
+            replica_urls: list[str] | None = None,
+            replica_strategy: str = "round_robin"
+    ):
+        if replica_strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {replica_strategy}")
+        self._engine_options = dict(
             echo=echo,
-            pool_pre_ping=True,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle,
+            pool_timeout=pool_timeout,
+            prepared_statement_cache_size=prepared_statement_cache_size
         )
+        self.engine = self._create_engine(url)
         self.session_factory = async_sessionmaker(
             bind=self.engine,
             autoflush=False,  # Подготовка к комиту
             expire_on_commit=False
         )
 
+        # Реплики только для чтения
+        self.replica_strategy = replica_strategy
+        self.replica_engines = [self._create_engine(replica_url) for replica_url in replica_urls or []]
+        self.replica_session_factories = [
+            async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+            for engine in self.replica_engines
+        ]
+        self._replica_cycle = itertools.cycle(range(len(self.replica_engines)))
+        self.primary_reads = 0
+        self.replica_reads = [0] * len(self.replica_engines)
+
+    def _create_engine(self, url: str):
+        options = self._engine_options
+        connect_args = {}
+        if make_url(url).drivername == "postgresql+asyncpg":
+            connect_args["prepared_statement_cache_size"] = options["prepared_statement_cache_size"]
+
+        engine = create_async_engine(
+            url=url,
+            echo=options["echo"],
+            poolclass=InstrumentedAsyncPool,
+            pool_pre_ping=True,
+            pool_size=options["pool_size"],
+            max_overflow=options["max_overflow"],
+            pool_recycle=options["pool_recycle"],
+            pool_timeout=options["pool_timeout"],
+            connect_args=connect_args,
+        )
+        self._instrument_pre_ping(engine)
+        return engine
+
+    @staticmethod
+    def _instrument_pre_ping(engine):
+        """Замерять pre-ping, который выполняется при каждой выдаче соединения из пула"""
+        dialect = engine.dialect
+        do_ping = dialect.do_ping
+
+        def timed_do_ping(dbapi_connection):
+            telemetry = engine.pool.telemetry
+            started_at = time.perf_counter()
+            try:
+                return do_ping(dbapi_connection)
+            except Exception:
+                telemetry.ping_failures += 1
+                raise
+            finally:
+                telemetry.pings += 1
+                telemetry.ping_seconds_total += time.perf_counter() - started_at
+
+        dialect.do_ping = timed_do_ping
+
+    @staticmethod
+    def _engine_pool_stats(engine) -> dict:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # overflow() отрицателен, пока основной пул не заполнен
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            **pool.telemetry.stats(),
+        }
+
+    def pool_stats(self) -> dict:
+        """Состояние пулов и накопленная телеметрия"""
+        stats = self._engine_pool_stats(self.engine)
+        if self.replica_engines:
+            stats["primary_reads"] = self.primary_reads
+            stats["replicas"] = [
+                {"url": engine.url.render_as_string(hide_password=True), "reads": reads, **self._engine_pool_stats(engine)}
+                for engine, reads in zip(self.replica_engines, self.replica_reads)
+            ]
+        return stats
+
+    def _pick_replica(self) -> int:
+        if self.replica_strategy == "least_connections":
+            return min(range(len(self.replica_engines)), key=lambda i: self.replica_engines[i].pool.checkedout())
+        return next(self._replica_cycle)
+
+    def get_read_session_factory(self, prefer_primary: bool = False):
+        """Фабрика сессий для чтения: реплика или основная БД, если реплик нет или нужен read-your-writes"""
+        if prefer_primary or not self.replica_engines:
+            self.primary_reads += 1
+            return self.session_factory
+        index = self._pick_replica()
+        self.replica_reads[index] += 1
+        return self.replica_session_factories[index]
+
     # Вспомогательная для scoped_session_dependency
     def get_scoped_session(self):
         session = async_scoped_session(
@@ -31,6 +205,18 @@ class DataBaseHelper:
             yield session
             await session.close()
 
+    @asynccontextmanager
+    async def read_session_for(self, request: Request):
+        """Сессия только для чтения: реплика, кроме короткого окна после записи этого клиента"""
+        prefer_primary = STICK_TO_PRIMARY_COOKIE in request.cookies
+        async with self.get_read_session_factory(prefer_primary)() as session:
+            yield session
+
+    async def read_session_dependency(self, request: Request):
+        async with self.read_session_for(request) as session:
+            yield session
+            await session.close()
+
     # Дает 1 сессию на все запросы функции, может экономить ресурсы, если много вызовов сессий
     async def scoped_session_dependency(self):
         session = self.get_scoped_session()
@@ -40,5 +226,12 @@ class DataBaseHelper:
 
 db_helper = DataBaseHelper(
     url=settings.db_url,
-    echo=settings.db_echo
+    echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    prepared_statement_cache_size=settings.db_prepared_statement_cache_size,
+    replica_urls=[url.strip() for url in settings.db_replica_urls.split(",") if url.strip()],
+    replica_strategy=settings.db_replica_strategy
 )
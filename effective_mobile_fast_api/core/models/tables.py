@@ -1,11 +1,12 @@
+from datetime import datetime
 from enum import Enum
 from typing import Optional, List
 import uuid
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import DDL, Index, UniqueConstraint, event, text
 from sqlmodel import Field, Relationship
 
-from effective_mobile_fast_api.core.models.base import BaseModel
+from effective_mobile_fast_api.core.models.base import BaseModel, uuid7
 
 
 class UserStatus(str, Enum):
@@ -14,7 +15,7 @@ class UserStatus(str, Enum):
 
 
 class User(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
     first_name: str = Field(..., max_length=50)
     last_name: str = Field(..., max_length=50)
     middle_name: Optional[str] = Field(default=None, max_length=50)
@@ -25,9 +26,17 @@ class User(BaseModel, table=True):
     # Связи с ролями
     user_roles: List["UserRole"] = Relationship(back_populates="user")
 
+    __table_args__ = (
+        # Список активных пользователей (keyset по id) читает только этот частичный индекс
+        Index(
+            "ix_users_active_id", "id",
+            postgresql_where=text("status = 'active'"), sqlite_where=text("status = 'active'")
+        ),
+    )
+
 
 class Role(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(..., max_length=50, unique=True)
     description: Optional[str] = Field(default=None, max_length=200)
     
@@ -37,7 +46,7 @@ class Role(BaseModel, table=True):
 
 
 class Permission(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(..., max_length=100, unique=True)
     resource: str = Field(..., max_length=50)  # например: "users", "products", "orders"
     action: str = Field(..., max_length=50)    # например: "read", "write", "delete"
@@ -46,53 +55,120 @@ class Permission(BaseModel, table=True):
     # Связи
     role_permissions: List["RolePermission"] = Relationship(back_populates="permission")
 
+    __table_args__ = (
+        Index("ix_permissions_resource_action", "resource", "action", postgresql_include=["id"]),
+    )
+
 
 class UserRole(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    user_id: str = Field(foreign_key="users.id")
-    role_id: str = Field(foreign_key="roles.id")
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id")
+    role_id: uuid.UUID = Field(foreign_key="roles.id")
     
     # Связи
     user: "User" = Relationship(back_populates="user_roles")
     role: "Role" = Relationship(back_populates="user_roles")
     
     __table_args__ = (
+        # uq_user_role(user_id, role_id) уже покрывает поиск ролей пользователя
         UniqueConstraint("user_id", "role_id", name="uq_user_role"),
+        Index("ix_userroles_role_id", "role_id", postgresql_include=["user_id"]),
     )
 
 
 class RolePermission(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    role_id: str = Field(foreign_key="roles.id")
-    permission_id: str = Field(foreign_key="permissions.id")
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
+    role_id: uuid.UUID = Field(foreign_key="roles.id")
+    permission_id: uuid.UUID = Field(foreign_key="permissions.id")
     
     # Связи
     role: "Role" = Relationship(back_populates="role_permissions")
     permission: "Permission" = Relationship(back_populates="role_permissions")
     
     __table_args__ = (
+        # uq_role_permission(role_id, permission_id) уже покрывает поиск разрешений роли
         UniqueConstraint("role_id", "permission_id", name="uq_role_permission"),
+        Index("ix_rolepermissions_permission_id", "permission_id", postgresql_include=["role_id"]),
     )
 
 
+# Отозванные JWT (по jti); строка нужна только до истечения токена
+class RevokedToken(BaseModel, table=True):
+    jti: str = Field(primary_key=True, max_length=64)
+    expires_at: datetime = Field(index=True)
+
+
 # Бизнес-модели
 class Product(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(..., max_length=100)
     description: Optional[str] = Field(default=None, max_length=500)
     price: float = Field(..., ge=0)
     category: str = Field(..., max_length=50)
 
 
+# Полнотекстовый поиск по продуктам (только PostgreSQL): генерируемая колонка tsvector
+# с весами name > category > description, GIN-индекс по ней и триграммный индекс по name
+# для поиска с опечатками. В модели колонки нет: ORM ее не читает и не пишет.
+PRODUCT_SEARCH_DDL = (
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+)
+for statement in PRODUCT_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+# Версия политики доступа: одна строка, увеличивается в каждой транзакции, меняющей роли, разрешения
+# или их назначения. По ней все процессы узнают об изменениях RBAC и проверяют права из access-токенов.
+class PolicyVersion(BaseModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0)
+
+
+# Агрегат для фасетов каталога: число продуктов по (категория, ценовой интервал).
+# Обновляется дельтами вместе с продуктами и пересчитывается целиком после импорта и при старте.
+class ProductFacet(BaseModel, table=True):
+    category: str = Field(primary_key=True, max_length=50)
+    price_bucket: int = Field(primary_key=True)
+    product_count: int = Field(default=0)
+
+
+# Итоги продаж по измерениям (total, status, product, category, user); ключ — значение измерения строкой.
+# Обновляются дельтами в транзакции изменения заказа, отчеты читают только эту таблицу.
+class SalesRollup(BaseModel, table=True):
+    dimension: str = Field(primary_key=True, max_length=20)
+    key: str = Field(primary_key=True, max_length=50)
+    order_count: int = Field(default=0)
+    quantity: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+    __table_args__ = (
+        # Топ по выручке внутри измерения без сортировки всей таблицы
+        Index("ix_salesrollups_dimension_revenue", "dimension", "revenue"),
+    )
+
+
 class Order(BaseModel, table=True):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
-    user_id: str = Field(foreign_key="users.id")
-    product_id: str = Field(foreign_key="products.id")
+    id: Optional[uuid.UUID] = Field(default_factory=uuid7, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id")
+    product_id: uuid.UUID = Field(foreign_key="products.id")
     quantity: int = Field(..., ge=1)
     total_amount: float = Field(..., ge=0)
     status: str = Field(default="pending", max_length=20)
+    # Категория продукта на момент заказа: по ней считаются итоги продаж
+    category: Optional[str] = Field(default=None, max_length=50)
     
     # Связи
     user: "User" = Relationship()
     product: "Product" = Relationship()
 
+    __table_args__ = (
+        # Заказы пользователя по страницам: WHERE user_id = ... ORDER BY id
+        Index("ix_orders_user_id_id", "user_id", "id"),
+    )
+
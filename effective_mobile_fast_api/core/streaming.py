@@ -0,0 +1,47 @@
+from typing import AsyncIterator, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from effective_mobile_fast_api.core.models import db_helper
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Сколько строк за раз забирается из серверного курсора
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Клиент запросил построчный JSON (Accept: application/x-ndjson)"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _iter_rows(request: Request, query, schema: Type[BaseModel]) -> AsyncIterator[str]:
+    # Сессия открывается внутри генератора: сессия из зависимости закрывается раньше,
+    # чем начинается отправка тела ответа
+    async with db_helper.read_session_for(request) as session:
+        rows = await session.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for row in rows:
+            yield schema.model_validate(row).model_dump_json()
+
+
+async def _ndjson_lines(rows: AsyncIterator[str]) -> AsyncIterator[str]:
+    async for row in rows:
+        yield row + "\n"
+
+
+async def _json_array_chunks(rows: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield "["
+    separator = ""
+    async for row in rows:
+        yield separator + row
+        separator = ","
+    yield "]"
+
+
+def stream_collection(request: Request, query, schema: Type[BaseModel]) -> StreamingResponse:
+    """Отдать всю выборку потоком: NDJSON или JSON-массив по частям; память не растет с числом строк"""
+    rows = _iter_rows(request, query, schema)
+    if wants_ndjson(request):
+        return StreamingResponse(_ndjson_lines(rows), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(_json_array_chunks(rows), media_type="application/json")
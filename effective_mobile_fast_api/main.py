@@ -8,10 +8,14 @@ from fastapi.staticfiles import StaticFiles
 from sqlmodel import SQLModel
 
 from effective_mobile_fast_api.api_v1 import router as router_v1
+from effective_mobile_fast_api.api_v1.auth.hashing import password_hasher
+from effective_mobile_fast_api.api_v1.auth.revocation import revocation_list
+from effective_mobile_fast_api.api_v1.business.facets import rebuild_facets
+from effective_mobile_fast_api.api_v1.business.sales_rollup import ensure_sales_rollups
 from effective_mobile_fast_api.api_v1.web.views import router as web_router
 from effective_mobile_fast_api.core.config import settings
 from effective_mobile_fast_api.core.models import db_helper
-from effective_mobile_fast_api.middleware.middleware import auth_middleware
+from effective_mobile_fast_api.middleware.middleware import auth_middleware, primary_stickiness_middleware
 
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -19,10 +23,23 @@ if sys.platform.startswith("win"):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Создание таблиц БД при запуске приложения"""
+    """Создание таблиц БД, пересчет фасетов и итогов продаж, настройка хеширования паролей и фоновое перестроение списка отозванных токенов"""
     async with db_helper.engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    async with db_helper.session_factory() as session:
+        await rebuild_facets(session)
+        await ensure_sales_rollups(session)
+    password_hasher.configure(
+        scheme=settings.password_hash_scheme,
+        rounds=settings.password_hash_rounds,
+        argon2_memory_cost=settings.argon2_memory_cost_kib
+    )
+    revocation_task = asyncio.create_task(
+        revocation_list.run_periodic_rebuild(settings.token_revocation_rebuild_seconds)
+    )
     yield
+    revocation_task.cancel()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -34,6 +51,8 @@ app = FastAPI(
 
 # Подключаем middleware для аутентификации
 app.middleware("http")(auth_middleware)
+# Read-your-writes при чтении с реплик
+app.middleware("http")(primary_stickiness_middleware)
 
 # Подключаем API роутеры
 app.include_router(router_v1, prefix=settings.api_v1_prefix)
@@ -1,29 +1,92 @@
 from fastapi import Request
 
 from effective_mobile_fast_api.api_v1.auth.config import Production
-from effective_mobile_fast_api.api_v1.auth.security import decode_jwt_token, generate_and_set_tokens
+from effective_mobile_fast_api.api_v1.auth.revocation import revocation_list
+from effective_mobile_fast_api.api_v1.auth.security import (
+    create_token_pair, decode_jwt_payload, refresh_coalescer, set_auth_cookies
+)
+from effective_mobile_fast_api.core.access_control import build_authz_claim
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.models import db_helper
+from effective_mobile_fast_api.core.models.db_helper import STICK_TO_PRIMARY_COOKIE
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# На выходе токены не обновляются: новая пара пережила бы отзыв текущей
+LOGOUT_PATHS = {f"{settings.api_v1_prefix}/auth/logout/", "/auth/logout"}
+
+
+async def _mint_tokens(user_id: str) -> tuple[str, str]:
+    """Выпустить новую пару токенов (с claim прав, если режим включен)"""
+    authz = None
+    if settings.jwt_embed_permissions:
+        async with db_helper.session_factory() as session:
+            authz = await build_authz_claim(session, user_id)
+    return create_token_pair(user_id, authz=authz)
+
+
+def _clears_auth_cookies(response) -> bool:
+    """Ответ удаляет cookie access_token (delete_cookie выставляет пустое значение)"""
+    return any(
+        header.startswith(('access_token=""', "access_token=;"))
+        for header in response.headers.getlist("set-cookie")
+    )
 
 
 async def auth_middleware(request: Request, call_next):
     access_token = request.cookies.get("access_token")
     refresh_token = request.cookies.get("refresh_token")
 
-    user_id = decode_jwt_token(access_token)
+    # Подпись проверяется через кэш JWT, затем jti проверяется по списку отозванных
+    payload = decode_jwt_payload(access_token)
+    if payload and await revocation_list.is_revoked(payload.get("jti")):
+        payload = None
+    user_id = payload.get("sub") if payload else None
 
     if user_id:
         # access_token валиден — продолжаем
         request.state.user_id = user_id
+        request.state.authz = payload.get("authz")
         response = await call_next(request)
         return response
 
+    if request.url.path in LOGOUT_PATHS:
+        return await call_next(request)
+
     # access_token не валиден, проверяем refresh_token (тоже JWT, без БД)
-    user_id = decode_jwt_token(refresh_token)
+    refresh_payload = decode_jwt_payload(refresh_token)
+    if refresh_payload and await revocation_list.is_revoked(refresh_payload.get("jti")):
+        refresh_payload = None
+    user_id = refresh_payload.get("sub") if refresh_payload else None
     if user_id:
+        # Параллельные запросы с тем же refresh_token получают одну и ту же новую пару
+        new_access_token, new_refresh_token = await refresh_coalescer.refresh(
+            refresh_token, lambda: _mint_tokens(str(user_id))
+        )
         request.state.user_id = user_id
+        request.state.authz = decode_jwt_payload(new_access_token).get("authz")
+        # Обработчик, отзывающий токены запроса, отзовет и эту пару
+        request.state.issued_tokens = (new_access_token, new_refresh_token)
         response = await call_next(request)
-        generate_and_set_tokens(response, str(user_id), secure=Production)
+        # Cookies, удаленные обработчиком, не выставляем заново
+        if not _clears_auth_cookies(response):
+            set_auth_cookies(response, new_access_token, new_refresh_token, secure=Production)
         return response
 
     # Нет валидных токенов — анонимный запрос
     response = await call_next(request)
     return response
+
+
+async def primary_stickiness_middleware(request: Request, call_next):
+    """После успешной записи клиент какое-то время читает из основной БД, а не с реплики"""
+    response = await call_next(request)
+    if db_helper.replica_engines and request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            key=STICK_TO_PRIMARY_COOKIE,
+            value="1",
+            max_age=settings.db_stick_to_primary_seconds,
+            httponly=True,
+            secure=Production,
+            samesite="lax"
+        )
+    return response
@@ -0,0 +1,116 @@
+"""
+Регрессионный бенчмарк списков: время ответа /orders/, /orders/my/ и /admin/users/ в зависимости от числа строк.
+
+Списки постраничные, поэтому время первой страницы не должно расти вместе с таблицей.
+
+Запуск:
+    python -m effective_mobile_fast_api.scripts.bench_list_endpoints [строк ...]
+
+Данные создаются в отдельной БД из BENCH_DB_URL (по умолчанию временный файл SQLite);
+таблицы в ней пересоздаются, поэтому не указывайте рабочую базу. Аутентификация
+подменяется через dependency_overrides, запросы идут через ASGI без сети
+(httpx и aiosqlite из группы dev).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_authz_soft, get_user_soft
+from effective_mobile_fast_api.core.access_control import AuthzContext, UserGrants
+from effective_mobile_fast_api.core.db import get_db, get_read_db
+from effective_mobile_fast_api.core.entities.users import UserPublic
+from effective_mobile_fast_api.core.models.tables import Order, Product, Role, User, UserRole
+from effective_mobile_fast_api.main import app
+
+ENDPOINTS = ["/api/v1/business/orders/", "/api/v1/business/orders/my/", "/api/v1/admin/users/"]
+REQUESTS_PER_ENDPOINT = 5
+
+
+async def seed(session_factory, rows: int) -> User:
+    """rows пользователей (по две роли) и rows заказов; все заказы принадлежат первому пользователю"""
+    async with session_factory() as session:
+        roles = [Role(name="admin"), Role(name="user")]
+        products = [Product(name=f"Product {i}", price=10 + i, category="bench") for i in range(50)]
+        session.add_all(roles + products)
+        await session.flush()
+
+        users = [
+            User(first_name="Bench", last_name="User", email=f"bench{i}@example.com", password_hash="x")
+            for i in range(rows)
+        ]
+        session.add_all(users)
+        await session.flush()
+        session.add_all(UserRole(user_id=user.id, role_id=role.id) for user in users for role in roles)
+        session.add_all(
+            Order(
+                user_id=users[0].id,
+                product_id=products[i % len(products)].id,
+                quantity=1,
+                total_amount=products[i % len(products)].price
+            )
+            for i in range(rows)
+        )
+        await session.commit()
+        return users[0]
+
+
+async def run(rows: int, engine, session_factory):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    owner = await seed(session_factory, rows)
+
+    async def bench_session():
+        async with session_factory() as session:
+            yield session
+
+    grants = UserGrants(
+        role_ids=frozenset(),
+        roles=frozenset({"admin"}),
+        permissions=frozenset({("orders", "read"), ("users", "read"), ("admin", "access")})
+    )
+    app.dependency_overrides[get_db] = bench_session
+    app.dependency_overrides[get_read_db] = bench_session
+    app.dependency_overrides[get_user_soft] = lambda: UserPublic.model_validate(owner)
+    app.dependency_overrides[get_authz_soft] = lambda: AuthzContext(grants)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ENDPOINTS:
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            started_at = time.perf_counter()
+            for _ in range(REQUESTS_PER_ENDPOINT):
+                await client.get(endpoint)
+            elapsed_ms = (time.perf_counter() - started_at) / REQUESTS_PER_ENDPOINT * 1000
+            results.append((endpoint, len(response.json()["items"]), elapsed_ms))
+
+    app.dependency_overrides.clear()
+    return results
+
+
+async def main(sizes: list[int]):
+    db_url = os.getenv("BENCH_DB_URL")
+    if db_url is None:
+        db_url = f"sqlite+aiosqlite:///{tempfile.gettempdir()}/bench_list_endpoints.sqlite"
+    engine = create_async_engine(db_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    print(f"{db_url}, {REQUESTS_PER_ENDPOINT} запросов на точку")
+    print(f"{'endpoint':<35} {'строк':>8} {'мс/запрос':>12}")
+    for rows in sizes:
+        for endpoint, returned, elapsed_ms in await run(rows, engine, session_factory):
+            print(f"{endpoint:<35} {returned:>8} {elapsed_ms:>12.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]))
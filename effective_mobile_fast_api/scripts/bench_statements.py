@@ -0,0 +1,90 @@
+"""
+Микробенчмарк: запрос, собираемый при каждом вызове, против заранее собранного запроса с bindparam.
+
+Запуск:
+    python -m effective_mobile_fast_api.scripts.bench_statements [итераций]
+
+База берется из DB_URL (по умолчанию SQLite в памяти; драйвер aiosqlite из группы dev). Для PostgreSQL/asyncpg
+разница включает и переиспользование подготовленных выражений.
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from effective_mobile_fast_api.api_v1.auth.crud import USER_BY_ID_STATEMENT
+from effective_mobile_fast_api.core.access_control import USER_ROLES_STATEMENT
+from effective_mobile_fast_api.core.models.tables import Role, User, UserRole
+
+
+async def measure(name: str, iterations: int, call) -> float:
+    """Среднее время одного вызова в микросекундах"""
+    for _ in range(min(iterations, 100)):
+        await call()
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    per_call = (time.perf_counter() - started_at) / iterations * 1_000_000
+    print(f"{name:<40} {per_call:>10.1f} мкс/вызов")
+    return per_call
+
+
+async def main(iterations: int):
+    db_url = os.getenv("DB_URL", "sqlite+aiosqlite:///:memory:")
+    engine = create_async_engine(db_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async with session_factory() as session:
+        user = User(
+            first_name="Bench", last_name="User", email=f"bench-{uuid.uuid4().hex}@example.com",
+            password_hash="x"
+        )
+        role = Role(name=f"bench-{uuid.uuid4().hex[:8]}")
+        session.add_all([user, role])
+        await session.flush()
+        user_role = UserRole(user_id=user.id, role_id=role.id)
+        session.add(user_role)
+        await session.commit()
+        user_id = user.id
+
+        async def user_inline():
+            await session.execute(select(User).where(User.id == user_id))
+
+        async def user_prebuilt():
+            await session.execute(USER_BY_ID_STATEMENT, {"user_id": user_id})
+
+        async def roles_inline():
+            await session.execute(
+                select(Role).join(UserRole, Role.id == UserRole.role_id).where(UserRole.user_id == user_id)
+            )
+
+        async def roles_prebuilt():
+            await session.execute(USER_ROLES_STATEMENT, {"user_id": user_id})
+
+        print(f"{db_url}, {iterations} итераций")
+        inline = await measure("get_user_by_id: select() на каждый вызов", iterations, user_inline)
+        prebuilt = await measure("get_user_by_id: готовый запрос", iterations, user_prebuilt)
+        print(f"{'экономия':<40} {inline - prebuilt:>10.1f} мкс/вызов")
+        inline = await measure("get_user_roles: select() на каждый вызов", iterations, roles_inline)
+        prebuilt = await measure("get_user_roles: готовый запрос", iterations, roles_prebuilt)
+        print(f"{'экономия':<40} {inline - prebuilt:>10.1f} мкс/вызов")
+
+        await session.delete(user_role)
+        await session.flush()
+        await session.delete(user)
+        await session.delete(role)
+        await session.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
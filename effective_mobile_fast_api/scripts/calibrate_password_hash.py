@@ -0,0 +1,31 @@
+"""
+Подбор стоимости хеширования паролей под целевое время проверки.
+
+Запуск:
+    python -m effective_mobile_fast_api.scripts.calibrate_password_hash [целевое время, мс]
+
+Замер выполняется один раз на машине того же класса, что и рабочие серверы;
+результат записывается в PASSWORD_HASH_ROUNDS и одинаково применяется всеми
+процессами. Стоимость ниже значения библиотеки по умолчанию не применяется.
+"""
+import sys
+
+from effective_mobile_fast_api.api_v1.auth.hashing import calibrate_rounds, pwd_options
+from effective_mobile_fast_api.core.config import settings
+
+
+def main(target_ms: float):
+    scheme = settings.password_hash_scheme
+    measured = calibrate_rounds(scheme, target_ms, settings.argon2_memory_cost_kib)
+    options = pwd_options(scheme, measured, settings.argon2_memory_cost_kib)
+    applied = options[f"{scheme}__default_rounds"]
+
+    print(f"Схема: {scheme}, целевое время проверки: {target_ms:.0f} мс")
+    print(f"Подобранная стоимость: {measured}, будет применена: {applied}")
+    if applied != measured:
+        print("Подобранная стоимость ниже значения по умолчанию и не применяется")
+    print(f"PASSWORD_HASH_ROUNDS={applied}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 250.0)
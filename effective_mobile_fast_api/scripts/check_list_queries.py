@@ -0,0 +1,135 @@
+"""
+Проверка на N+1: число SQL-запросов страниц администрирования не должно зависеть от объема данных.
+
+Для каждой страницы (/admin/users, /admin/roles, /admin/permissions и списки JSON API)
+запросы считаются слушателем before_cursor_execute при двух объемах данных; при
+расхождении скрипт завершается с ошибкой.
+
+Запуск:
+    python -m effective_mobile_fast_api.scripts.check_list_queries [меньший объем] [больший объем]
+
+Данные создаются в отдельной БД из BENCH_DB_URL (по умолчанию временный файл SQLite);
+таблицы в ней пересоздаются, поэтому не указывайте рабочую базу. Аутентификация
+подменяется через dependency_overrides, запросы идут через ASGI без сети
+(httpx и aiosqlite из группы dev).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from effective_mobile_fast_api.api_v1.auth.dependencies import get_authz_soft, get_user_soft
+from effective_mobile_fast_api.core.access_control import AuthzContext, UserGrants
+from effective_mobile_fast_api.core.db import get_db, get_read_db
+from effective_mobile_fast_api.core.entities.users import UserPublic
+from effective_mobile_fast_api.core.models.tables import Permission, Role, RolePermission, User, UserRole
+from effective_mobile_fast_api.main import app
+
+ENDPOINTS = [
+    "/admin/users", "/admin/roles", "/admin/permissions",
+    "/api/v1/admin/users/", "/api/v1/admin/roles/", "/api/v1/admin/permissions/",
+]
+PERMISSIONS_PER_ROLE = 5
+
+
+async def seed(session_factory, rows: int) -> User:
+    """rows пользователей, rows // 10 ролей по две на пользователя и rows // 5 разрешений по PERMISSIONS_PER_ROLE на роль"""
+    async with session_factory() as session:
+        roles = [Role(name=f"role{i}", description="bench") for i in range(max(2, rows // 10))]
+        permissions = [
+            Permission(name=f"permission{i}", resource=f"resource{i % 7}", action=f"action{i}")
+            for i in range(max(PERMISSIONS_PER_ROLE, rows // 5))
+        ]
+        users = [
+            User(first_name="Bench", last_name="User", email=f"bench{i}@example.com", password_hash="x")
+            for i in range(rows)
+        ]
+        session.add_all(roles + permissions + users)
+        await session.flush()
+
+        session.add_all(
+            UserRole(user_id=user.id, role_id=roles[(i + shift) % len(roles)].id)
+            for i, user in enumerate(users) for shift in (0, 1)
+        )
+        session.add_all(
+            RolePermission(role_id=role.id, permission_id=permissions[(i + shift) % len(permissions)].id)
+            for i, role in enumerate(roles) for shift in range(PERMISSIONS_PER_ROLE)
+        )
+        await session.commit()
+        return users[0]
+
+
+async def count_statements(rows: int, engine, session_factory) -> dict[str, int]:
+    """Число запросов к БД на одну загрузку каждой страницы"""
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    admin = await seed(session_factory, rows)
+
+    async def bench_session():
+        async with session_factory() as session:
+            yield session
+
+    grants = UserGrants(role_ids=frozenset(), roles=frozenset({"admin"}), permissions=frozenset())
+    app.dependency_overrides[get_db] = bench_session
+    app.dependency_overrides[get_read_db] = bench_session
+    app.dependency_overrides[get_user_soft] = lambda: UserPublic.model_validate(admin)
+    app.dependency_overrides[get_authz_soft] = lambda: AuthzContext(grants)
+
+    statements = 0
+
+    def on_execute(*args):
+        nonlocal statements
+        statements += 1
+
+    counts = {}
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint in ENDPOINTS:
+                statements = 0
+                response = await client.get(endpoint)
+                response.raise_for_status()
+                # Страницы перехватывают исключения и показывают их текстом — такой ответ не считается
+                if "Ошибка" in response.text:
+                    raise SystemExit(f"{endpoint}: страница вернула ошибку")
+                counts[endpoint] = statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+        app.dependency_overrides.clear()
+    return counts
+
+
+async def main(small: int, large: int):
+    db_url = os.getenv("BENCH_DB_URL")
+    if db_url is None:
+        db_url = f"sqlite+aiosqlite:///{tempfile.gettempdir()}/check_list_queries.sqlite"
+    engine = create_async_engine(db_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    small_counts = await count_statements(small, engine, session_factory)
+    large_counts = await count_statements(large, engine, session_factory)
+    await engine.dispose()
+
+    print(f"{db_url}")
+    print(f"{'endpoint':<35} {small:>10} {large:>10}")
+    failed = []
+    for endpoint in ENDPOINTS:
+        print(f"{endpoint:<35} {small_counts[endpoint]:>10} {large_counts[endpoint]:>10}")
+        if small_counts[endpoint] != large_counts[endpoint]:
+            failed.append(endpoint)
+
+    if failed:
+        raise SystemExit(f"Число запросов растет с объемом данных: {', '.join(failed)}")
+    print("OK: число запросов не зависит от объема данных")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:3]] or [20, 200]
+    asyncio.run(main(*sizes))
@@ -0,0 +1,66 @@
+"""
+Планы выполнения горячих запросов: «мои заказы», проверки RBAC, список активных пользователей.
+
+Запуск:
+    python -m effective_mobile_fast_api.scripts.explain_hot_paths
+
+База берется из DB_URL (настройки приложения). В PostgreSQL выполняется EXPLAIN (ANALYZE, BUFFERS),
+в SQLite — EXPLAIN QUERY PLAN. Запросы только читают данные; чтобы сравнить планы до и после
+индексов, запустите скрипт до и после `alembic upgrade head`.
+"""
+import asyncio
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from effective_mobile_fast_api.api_v1.auth.crud import USER_BY_EMAIL_STATEMENT
+from effective_mobile_fast_api.core.access_control import (
+    PERMISSION_INDEX_STATEMENT, ROLE_GRANTS_STATEMENT, USER_PERMISSIONS_STATEMENT, USER_ROLE_IDS_STATEMENT
+)
+from effective_mobile_fast_api.core.config import settings
+from effective_mobile_fast_api.core.entities.pagination import DEFAULT_PAGE_LIMIT
+from effective_mobile_fast_api.core.models.tables import Order, User, UserRole
+
+
+def hot_paths(user_id, email) -> dict:
+    """Запросы в том виде, в каком их выполняет приложение, с подставленными параметрами"""
+    return {
+        "мои заказы (первая страница)": (
+            select(Order).where(Order.user_id == user_id).order_by(Order.id).limit(DEFAULT_PAGE_LIMIT + 1)
+        ),
+        "роли пользователя": USER_ROLE_IDS_STATEMENT.params(user_id=user_id),
+        "разрешения пользователя": USER_PERMISSIONS_STATEMENT.params(user_id=user_id),
+        "матрица ролей и разрешений": ROLE_GRANTS_STATEMENT,
+        "индекс разрешений": PERMISSION_INDEX_STATEMENT,
+        "активные пользователи (первая страница)": (
+            select(User).where(User.status == "active").order_by(User.id).limit(DEFAULT_PAGE_LIMIT + 1)
+        ),
+        "вход по email": USER_BY_EMAIL_STATEMENT.params(email=email),
+    }
+
+
+async def main():
+    engine = create_async_engine(settings.db_url)
+    async with engine.connect() as conn:
+        dialect = conn.dialect
+        explain = "EXPLAIN (ANALYZE, BUFFERS)" if dialect.name == "postgresql" else "EXPLAIN QUERY PLAN"
+
+        # Пользователь с заказами и ролями дает самые показательные планы
+        user_id = (await conn.execute(select(Order.user_id).limit(1))).scalar()
+        if user_id is None:
+            user_id = (await conn.execute(select(UserRole.user_id).limit(1))).scalar()
+        email = (await conn.execute(select(User.email).where(User.id == user_id))).scalar() or ""
+
+        for name, statement in hot_paths(user_id, email).items():
+            sql = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+            rows = (await conn.execute(text(f"{explain} {sql}"))).all()
+            print(f"== {name}")
+            for row in rows:
+                print("   ", row[-1])
+            print()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
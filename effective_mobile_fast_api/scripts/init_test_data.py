@@ -11,6 +11,9 @@ from effective_mobile_fast_api.core.models.tables import (
     User, Role, Permission, UserRole, RolePermission, Product, Order, UserStatus
 )
 from effective_mobile_fast_api.api_v1.auth.security import hash_password
+from effective_mobile_fast_api.api_v1.business.facets import rebuild_facets
+from effective_mobile_fast_api.api_v1.business.sales_rollup import rebuild_sales_rollups
+from effective_mobile_fast_api.core.access_control import bump_policy_version
 
 
 async def create_test_data():
@@ -154,6 +157,7 @@ async def create_test_data():
             ]
             
             session.add_all(user_roles)
+            await bump_policy_version(session)
             await session.commit()
             
             # Создаем тестовые продукты
@@ -186,12 +190,14 @@ async def create_test_data():
             
             session.add_all(products)
             await session.commit()
+            await rebuild_facets(session)
             
             # Создаем тестовые заказы
             orders = [
                 Order(
                     user_id=users[2].id,  # Пользователь
                     product_id=products[0].id,
+                    category=products[0].category,
                     quantity=1,
                     total_amount=120000.0,
                     status="completed"
@@ -199,6 +205,7 @@ async def create_test_data():
                 Order(
                     user_id=users[2].id,  # Пользователь
                     product_id=products[2].id,
+                    category=products[2].category,
                     quantity=2,
                     total_amount=5000.0,
                     status="pending"
@@ -206,6 +213,7 @@ async def create_test_data():
                 Order(
                     user_id=users[1].id,  # Менеджер
                     product_id=products[1].id,
+                    category=products[1].category,
                     quantity=1,
                     total_amount=150000.0,
                     status="processing"
@@ -214,6 +222,7 @@ async def create_test_data():
             
             session.add_all(orders)
             await session.commit()
+            await rebuild_sales_rollups(session)
             
             print("✅ Тестовые данные успешно созданы!")
             print("\n📋 Созданные пользователи:")
@@ -0,0 +1,34 @@
+"""Число SQL-запросов списков администрирования не зависит от объема данных (N+1)"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from effective_mobile_fast_api.scripts.check_list_queries import ENDPOINTS, count_statements
+
+SMALL, LARGE = 10, 60
+
+
+@pytest.fixture(scope="module")
+def statement_counts(tmp_path_factory):
+    """Число запросов каждой страницы при меньшем и большем объеме данных"""
+    db_path = tmp_path_factory.mktemp("list_queries") / "db.sqlite"
+
+    async def measure():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            small = await count_statements(SMALL, engine, session_factory)
+            large = await count_statements(LARGE, engine, session_factory)
+        finally:
+            await engine.dispose()
+        return small, large
+
+    return asyncio.run(measure())
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_statement_count_is_constant(statement_counts, endpoint):
+    small, large = statement_counts
+    assert small[endpoint] > 0
+    assert small[endpoint] == large[endpoint]